@@ -1,9 +1,25 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import io
-import re
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from vm_reader import (
+    read_vm_csv, file_digest, extract_report_date, ingest_parallel, ratio_inputs, iter_report_members, report_member_names, REPORT_UPLOAD_TYPES,
+)
+import vm_store
+from vm_engine import (
+    aggregate_by_date, column_by_date, date_rollups, rollup_view, available_granularities, period_analytics, rank_companies, rank_window, top_and_bottom, update_aggregates,
+    company_rows, company_period_index, company_names, company_trends, index_dates, top_movers, ROLLUP_GRANULARITIES,
+)
+from vm_export import ExportCache, EXCEL_MIME
+from vm_charts import (
+    company_bar_chart, date_bar_chart, date_trend_chart, month_comparison_chart, period_change_chart, rolling_trend_chart,
+    account_trend_chart, top_movers_chart, DEFAULT_TOP_N,
+)
+from vm_metrics import timed_stage
+from vm_session import ParseCache, SessionFrames
 
 st.set_page_config(layout="wide")
 
@@ -38,21 +54,348 @@ def colored_metric(label, value, color):
         unsafe_allow_html=True
     )
 
-# --------- SESSION STATE SETUP ---------
-if "uploaded_df_tab1" not in st.session_state:
-    st.session_state.uploaded_df_tab1 = None
+# --------- STAGE METRICS ---------
+# Stage timings for the diagnostics sidebar; each record is also appended to the JSON log
+MAX_STAGE_RECORDS = 200
+
+def timed(stage, rows=None, **fields):
+    return timed_stage(stage, rows, st.session_state.get("stage_metrics"), **fields)
+
+# --------- CSV PARSE CACHE ---------
+# Parsed frames are keyed by a hash of the raw file bytes and shared across sessions,
+# so reruns (and other users loading the same report) never re-parse a CSV. The cache
+# evicts its least recently used frames past VM_PARSE_CACHE_MB of memory.
+@st.cache_resource
+def get_parse_cache():
+    return ParseCache()
+
+def _parse_csv(digest, data):
+    def parse():
+        # Only cache misses get here, so csv_read records real parses
+        with timed("csv_read", bytes=len(data)) as record:
+            df = read_vm_csv(data)
+            record["rows"] = len(df)
+        return df
+    return get_parse_cache().get_or_create(digest, parse)
+
+def load_csv_with_digest(source):
+    # Accepts a local file path, raw CSV bytes or a Streamlit UploadedFile
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            data = f.read()
+    elif isinstance(source, (bytes, bytearray)):
+        data = source
+    else:
+        data = source.getvalue()
+    digest = file_digest(data)
+    return _parse_csv(digest, data), digest
+
+def load_csvs_parallel(sources, label, load=load_csv_with_digest, total=None):
+    # sources: {key: path or UploadedFile}, or lazily generated (key, source) pairs with
+    # their total. Parses in a bounded thread pool and returns ({key: (df, digest)},
+    # {key: error}); workers share this run's script context so the parse cache and
+    # stage metrics work from inside the pool.
+    ctx = get_script_run_ctx()
+    progress = st.progress(0.0, text=label)
+
+    def on_progress(done, total, key):
+        progress.progress(min(done / total, 1.0) if total else 0.0, text=f"{label} ({done}/{total or '?'})")
+
+    loaded, errors = ingest_parallel(
+        sources,
+        load,
+        on_progress=on_progress,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+        total=total,
+    )
+    progress.empty()
+    return loaded, errors
+
+# --------- PER-DATE AGGREGATES ---------
+# Every numeric column is summed per report up front, so picking a different column to
+# graph costs no extra compute. Loaded reports keep their sums in
+# st.session_state.report_aggregates, updated report by report as files come and go;
+# the report store caches its per-column sums against the stored file set.
+@st.cache_data(max_entries=32, show_spinner=False)
+def _store_date_aggregates(column, file_set_key):
+    # The report store reads just the selected column, so it is part of the key.
+    # Only cache misses get here, so per_date_sum records real summing.
+    with timed("per_date_sum", column=column) as record:
+        aggregates = aggregate_by_date(vm_store.read_column(column))
+        record["rows"] = len(aggregates)
+    return aggregates
+
+def upload_file_set_key(reports):
+    return tuple(sorted((filename, data["date"], data.get("digest")) for filename, data in reports.items()))
+
+def store_file_set_key():
+    files = vm_store.load_manifest()["files"]
+    return tuple(sorted((filename, record["date"], record["digest"]) for filename, record in files.items()))
+
+def store_date_aggregates(column):
+    return _store_date_aggregates(column, store_file_set_key())
+
+# --------- SESSION FRAMES ---------
+# The single-file tab's report and the views derived from loaded reports live in
+# st.session_state.frames, which keeps each session under a memory cap by spilling its
+# least recently used frames to disk; reading a spilled frame loads it back.
+def get_frame(key):
+    frames = st.session_state.frames
+    return frames[key] if key in frames else None
+
+def set_frame(key, df):
+    if df is None:
+        st.session_state.frames.pop(key, None)
+    else:
+        st.session_state.frames[key] = df
+
+# --------- COMPANY × PERIOD INDEX ---------
+# Per-company rows of each loaded report are kept next to the per-date sums and updated
+# report by report; the index the account trends tab queries is rebuilt from those rows
+# (not from the report frames) whenever the loaded set changes.
+def refresh_company_index(added=None, removed=()):
+    with timed("company_index") as record:
+        rows = update_aggregates(get_frame("company_rows"), added=added, removed=removed, aggregate=company_rows)
+        set_frame("company_rows", rows)
+        set_frame("company_index", company_period_index(rows))
+        set_frame("company_names", company_names(rows))
+        record["rows"] = len(rows)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _store_company_index(file_set_key):
+    rows = company_rows(vm_store.read_reports())
+    return company_period_index(rows), company_names(rows)
+
+def current_company_index():
+    # (index, names) of the report store or the loaded reports
+    if st.session_state.use_store:
+        return _store_company_index(store_file_set_key())
+    return get_frame("company_index"), get_frame("company_names")
+
+# --------- CALENDAR ROLLUPS ---------
+# Sums of every column per period are rebuilt in full from the per-date sums whenever
+# the loaded set changes and kept as session frames, so the granularity selector only
+# picks which one to draw. Only the granularities the selector offers are built (no
+# daily / weekly rollups while every report is monthly). The report store caches them
+# per column.
+def refresh_date_rollups():
+    aggregates = st.session_state.report_aggregates
+    granularities = available_granularities(report_dates()) if aggregates is not None else []
+    with timed("date_rollups", rows=0 if aggregates is None else len(aggregates)):
+        rollups = date_rollups(aggregates, granularities) if aggregates is not None else {}
+    for granularity in ROLLUP_GRANULARITIES:
+        set_frame(("rollup", granularity), rollups.get(granularity))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _store_date_rollups(column, file_set_key, granularities):
+    return date_rollups(_store_date_aggregates(column, file_set_key), granularities)
+
+def date_rollup(column, granularity):
+    if st.session_state.use_store:
+        granularities = tuple(available_granularities(report_dates()))
+        return _store_date_rollups(column, store_file_set_key(), granularities)[granularity]
+    return get_frame(("rollup", granularity))
+
+def report_dates():
+    if st.session_state.use_store:
+        return [record["date"] for record in vm_store.load_manifest()["files"].values()]
+    return [data["date"] for data in st.session_state.uploaded_data.values()]
+
+# --------- LOADED REPORT SET ---------
+# st.session_state.uploaded_data keeps each report's date, digest and columns. The
+# frames themselves aren't kept: everything the views need (per-date sums, company rows,
+# rollups) is derived from them as they are added.
+def add_reports(reports):
+    # Only the added reports are summed; a re-added filename replaces its old rows
+    for filename, data in reports.items():
+        st.session_state.uploaded_data[filename] = {
+            "date": data["date"],
+            "digest": data.get("digest"),
+            "columns": list(data["df"].columns),
+        }
+    with timed("per_date_sum", rows=sum(len(data["df"]) for data in reports.values())):
+        st.session_state.report_aggregates = update_aggregates(st.session_state.report_aggregates, added=reports)
+    refresh_company_index(added=reports)
+    refresh_date_rollups()
+    st.session_state.report_set_changed = True
+
+def remove_reports(filenames):
+    for filename in filenames:
+        st.session_state.uploaded_data.pop(filename, None)
+    with timed("per_date_sum", rows=len(filenames)):
+        st.session_state.report_aggregates = update_aggregates(st.session_state.report_aggregates, removed=filenames)
+    refresh_company_index(removed=filenames)
+    refresh_date_rollups()
+    st.session_state.report_set_changed = True
+
+def clear_reports():
+    st.session_state.uploaded_data = {}
+    st.session_state.report_aggregates = None
+    for key in ["company_rows", "company_index", "company_names"]:
+        set_frame(key, None)
+    for granularity in ROLLUP_GRANULARITIES:
+        set_frame(("rollup", granularity), None)
+    st.session_state.upload_ids = {}
+    st.session_state.report_set_changed = True
+
+# --------- LOAD NOTICES ---------
+# Reports are loaded in a rerun of the multi-file tab only, so the whole app is rerun
+# afterwards for the account trends tab to see the new report set. Messages about the
+# load are kept until that rerun has shown them again.
+def load_notice(kind, message):
+    # kind is the st function to show it with: "error", "warning", "success" or "markdown"
+    st.session_state.load_notices.append((kind, message))
+    getattr(st, kind)(message)
+
+def rerun_if_report_set_changed():
+    if st.session_state.report_set_changed:
+        st.session_state.report_set_changed = False
+        st.session_state.carried_notices = st.session_state.load_notices
+        st.session_state.load_notices = []
+        st.rerun()
+    st.session_state.load_notices = []
+
+# --------- EXPORT CACHE ---------
+# Workbooks are cached per view (tab1 / tab2) by input file hashes and view parameters,
+# so repeat downloads are instant and the two tabs never overwrite each other's export.
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
+
+def excel_download(view, label, file_name):
+    # Shows the download button when the view's current workbook is cached
+    export_key = st.session_state.export_keys.get(view)
+    excel_path = get_export_cache().get(export_key) if export_key else None
+    if excel_path is None:
+        return
+    try:
+        with open(excel_path, "rb") as excel_file:
+            if st.download_button(label=label, data=excel_file, file_name=file_name, mime=EXCEL_MIME):
+                st.success("✅ Excel file downloaded!")
+    except FileNotFoundError:  # Evicted by another session between lookup and open
+        pass
+
+# --------- TIME SERIES VIEW ---------
+def time_series_charts(column_to_graph, granularity):
+    # Per-date sums, calendar rollups, period analytics and their charts for the loaded
+    # reports or the report store (which only reads the selected column from disk)
+    # The sums themselves are timed where they are computed: as reports are added or
+    # removed, or on a report store cache miss
+    if st.session_state.use_store:
+        aggregates = store_date_aggregates(column_to_graph)
+        file_set_key = store_file_set_key()
+    else:
+        aggregates = st.session_state.report_aggregates
+        file_set_key = upload_file_set_key(st.session_state.uploaded_data)
+
+    # Point the export at this file set / column
+    st.session_state.export_keys["tab2"] = ("tab2", file_set_key, column_to_graph, granularity)
+
+    comparison_df_time = column_by_date(aggregates, column_to_graph)
+
+    if not comparison_df_time.empty:
+        comparison_df_time = comparison_df_time.sort_values(by="Date")
+        # Store filtered for Excel export
+        set_frame("comparison_df_time", comparison_df_time)
+
+        # MoM / YoY / rolling / YTD for the month-based figures, in one pass
+        with timed("period_analytics", rows=len(aggregates), column=column_to_graph):
+            analytics = period_analytics(aggregates, column_to_graph)
+        set_frame("period_analytics", analytics)
+
+        # One point per day / week / month / quarter on a date axis
+        rollup = rollup_view(date_rollup(column_to_graph, granularity), column_to_graph)
+        set_frame("date_rollup", rollup)
+
+        with timed("date_bar_chart", rows=len(rollup), column=column_to_graph, granularity=granularity):
+            fig_bar = date_bar_chart(rollup, column_to_graph, granularity)
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+        with timed("date_trend_chart", rows=len(rollup), column=column_to_graph, granularity=granularity):
+            fig_line = date_trend_chart(rollup, column_to_graph, granularity)
+        st.plotly_chart(fig_line, use_container_width=True)
+
+        with timed("month_comparison_chart", rows=len(analytics), column=column_to_graph):
+            fig_month = month_comparison_chart(analytics, column_to_graph)
+        st.plotly_chart(fig_month, use_container_width=True)
+
+        with timed("period_change_chart", rows=len(analytics), column=column_to_graph):
+            fig_change = period_change_chart(analytics, column_to_graph)
+        st.plotly_chart(fig_change, use_container_width=True)
+
+        with timed("rolling_trend_chart", rows=len(analytics), column=column_to_graph):
+            fig_rolling = rolling_trend_chart(analytics, column_to_graph)
+        st.plotly_chart(fig_rolling, use_container_width=True)
+
+# --------- WATCHED FOLDER ---------
+# One watcher per folder, shared by every session; each session polls it on a timer
+@st.cache_resource
+def get_watcher(source_dir):
+    return vm_store.DirectoryWatcher(source_dir)
+
+@st.fragment(run_every=vm_store.WATCH_INTERVAL_SECONDS)
+def watched_folder_status():
+    # When a poll ingested new exports the whole app reruns, so the column list and the
+    # live charts pick up the new reports; otherwise only this status line refreshes
+    if not os.path.isdir(st.session_state.watch_dir):  # Removed or unmounted since watching began
+        st.error(f"🚨 Watched folder not found: {st.session_state.watch_dir}")
+        return
+    watcher = get_watcher(st.session_state.watch_dir)
+    version = watcher.poll()
+    checked = time.strftime("%H:%M:%S", time.localtime(watcher.last_poll)) if watcher.last_poll else "never"
+    st.caption(f"👀 Watching {watcher.source_dir} (checked {checked}, every {vm_store.WATCH_INTERVAL_SECONDS:g}s)")
+    if watcher.last_result:
+        for filename, error in watcher.last_result["errors"].items():
+            st.error(f"🚨 Error reading CSV file '{filename}': {error}")
+    if version != st.session_state.watch_version:
+        st.session_state.watch_version = version
+        st.rerun()
+
+# --------- PAGINATED DATA VIEWS ---------
+# Only the visible page is pulled out of the frame and sent to the browser.
+PAGE_SIZE_OPTIONS = [25, 50, 100, 500]
+
+def paginated_dataframe(key, total_rows, get_rows):
+    # get_rows(start, stop) returns the rows for the current page
+    # No st.columns here: the views already sit inside nested columns
+    page_size = st.selectbox("Rows per page", options=PAGE_SIZE_OPTIONS, key=f"{key}_page_size")
+    page_count = max(1, -(-total_rows // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total_rows)
+    st.dataframe(get_rows(start, stop), hide_index=True)
+    st.caption(f"Rows {start + 1 if total_rows else 0}–{stop} of {total_rows}")
 
-if "filtered_df" not in st.session_state:
-    st.session_state.filtered_df = None
+# --------- SESSION STATE SETUP ---------
+if "frames" not in st.session_state:
+    st.session_state.frames = SessionFrames()  # Loaded reports, the company index and every derived view
 
 if "uploaded_data" not in st.session_state:
-    st.session_state.uploaded_data = {}
+    st.session_state.uploaded_data = {}  # Filename -> date, digest and columns of a loaded report
+
+if "filtered_sort" not in st.session_state:
+    st.session_state.filtered_sort = None  # (column, ascending) applied to filtered_df on demand
+
+if "report_aggregates" not in st.session_state:
+    st.session_state.report_aggregates = None  # Per-report sums of uploaded_data
+
+if "upload_ids" not in st.session_state:
+    st.session_state.upload_ids = {}  # Uploader file_id -> filenames loaded from it (several for a .zip)
+
+if "report_set_changed" not in st.session_state:
+    st.session_state.report_set_changed = False  # Reports were loaded or removed in this run
 
-if "comparison_df_time" not in st.session_state:
-    st.session_state.comparison_df_time = None
+if "load_notices" not in st.session_state:
+    st.session_state.load_notices = []  # (kind, message) shown while loading reports this run
 
-if "excel_bytes" not in st.session_state:
-    st.session_state.excel_bytes = None
+if "carried_notices" not in st.session_state:
+    st.session_state.carried_notices = []  # Load notices of the run cut short by the rerun
+
+if "export_keys" not in st.session_state:
+    st.session_state.export_keys = {}  # View -> export cache key of its current data
+
+if "uploaded_digest_tab1" not in st.session_state:
+    st.session_state.uploaded_digest_tab1 = None
 
 if "use_demo" not in st.session_state:
     st.session_state.use_demo = False
@@ -60,6 +403,28 @@ if "use_demo" not in st.session_state:
 if "uploaded_file" not in st.session_state:
     st.session_state.uploaded_file = None
 
+if "watch_dir" not in st.session_state:
+    # Server-side folder kept in sync with the store; absolute, so the env var and the
+    # Watch Folder button share one cached watcher per folder
+    st.session_state.watch_dir = None
+    env_watch_dir = os.environ.get("VM_WATCH_DIR")
+    if env_watch_dir and os.path.isdir(env_watch_dir):
+        st.session_state.watch_dir = os.path.abspath(env_watch_dir)
+    elif env_watch_dir:
+        st.error(f"🚨 VM_WATCH_DIR folder not found: {env_watch_dir}")
+
+if "watch_version" not in st.session_state:
+    st.session_state.watch_version = None  # Last watcher version this session has drawn
+
+if "graphed_column" not in st.session_state:
+    st.session_state.graphed_column = None  # Column charted in the multi-file tab, redrawn on every run
+
+if "use_store" not in st.session_state:
+    st.session_state.use_store = st.session_state.watch_dir is not None
+
+if "stage_metrics" not in st.session_state:
+    st.session_state.stage_metrics = deque(maxlen=MAX_STAGE_RECORDS)
+
 st.markdown("""
     <style>
         div[data-testid="stTabs"] button {
@@ -70,10 +435,11 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-tab1, tab2 = st.tabs(["Single CSV Analysis by Company", "Multi CSV Analysis by Date"])
-
-with tab1:
+tab1, tab2, tab3 = st.tabs(["Single CSV Analysis by Company", "Multi CSV Analysis by Date", "Account Trends by Company"])
 
+@st.fragment
+def single_csv_tab():
+    # Widgets in here only rerun this tab, never the multi-file tab
     col1, col2, col3 = st.columns([1, 3, 1])
 
     with col2:
@@ -84,7 +450,7 @@ with tab1:
         st.write('')
 
         # Handle file upload
-        uploaded_file = st.file_uploader("📄 Select Visual Matrix output CSV to analyze", type="csv")
+        uploaded_file = st.file_uploader("📄 Select Visual Matrix output CSV to analyze (.csv, .csv.gz or .zip)", type=REPORT_UPLOAD_TYPES)
 
         # Handle demo file button
         use_demo = st.button("📂 Use Demo File")
@@ -99,8 +465,9 @@ with tab1:
             # Load demo file
             # Example demo DataFrame
             demo_data_path = 'Company Revenue Report Demo.csv'
-            df = pd.read_csv(demo_data_path).reset_index(drop=True)
-            st.session_state.uploaded_df_tab1 = df
+            df, digest = load_csv_with_digest(demo_data_path)
+            set_frame("uploaded_df_tab1", df)
+            st.session_state.uploaded_digest_tab1 = digest
             st.success("✅ Demo file loaded!")
 
         elif uploaded_file is not None:
@@ -109,10 +476,21 @@ with tab1:
             st.session_state.uploaded_file = uploaded_file
             st.session_state.generated_graph = None  # Reset the graph
             
-            # Load uploaded file
-            df = pd.read_csv(uploaded_file).reset_index(drop=True)
-            st.session_state.uploaded_df_tab1 = df
-            st.success("✅ CSV file uploaded and stored!")
+            # Load uploaded file; a compressed upload contributes its first CSV
+            try:
+                member_names = report_member_names(uploaded_file.name, uploaded_file)
+                if not member_names:
+                    raise ValueError("no CSV file found in the archive")
+                if len(member_names) > 1:
+                    st.info(f"📦 {uploaded_file.name} holds {len(member_names)} reports; analyzing {member_names[0]}. Use the Multi CSV tab for bundles.")
+                _, read_member = next(iter_report_members(uploaded_file.name, uploaded_file))
+                df, digest = load_csv_with_digest(read_member())
+            except (zipfile.BadZipFile, OSError, EOFError, ValueError) as e:
+                st.error(f"🚨 Error reading uploaded file '{uploaded_file.name}': {e}")
+            else:
+                set_frame("uploaded_df_tab1", df)
+                st.session_state.uploaded_digest_tab1 = digest
+                st.success("✅ CSV file uploaded and stored!")
 
         # Ensure only one file source is active
         if st.session_state.use_demo:
@@ -121,7 +499,8 @@ with tab1:
             st.info("Using the uploaded file. Selecting the demo file will reset this option.")
 
         # --------- UI OPTIONS ---------
-        if st.session_state.uploaded_df_tab1 is not None:
+        uploaded_df = get_frame("uploaded_df_tab1")
+        if uploaded_df is not None:
             st.markdown("---")  # Just a divider line for UX
             st.subheader("🔍 Choose what to graph:")
             st.write('')
@@ -129,108 +508,106 @@ with tab1:
             st.caption("If viewing the original data will assist in column selection, check box:")
             show_original = st.checkbox("🗃️ Show Original Data", value=False)
             if show_original:
-                if "uploaded_df_tab1" in st.session_state:
-                    st.subheader("Original Uploaded Data")
-                    st.dataframe(st.session_state.uploaded_df_tab1, hide_index=True)
-                else:
-                    st.warning("No uploaded data available.")
+                st.subheader("Original Uploaded Data")
+                paginated_dataframe("original_data", len(uploaded_df), lambda start, stop: uploaded_df.iloc[start:stop])
 
             column_to_graph = st.selectbox(
                 "Which data column do you want to analyze?",
-                options=[col for col in st.session_state.uploaded_df_tab1.columns if col not in ["CompanyName", "CompanyCode"]],
+                options=[col for col in uploaded_df.columns if col not in ["CompanyName", "CompanyCode"]],
             )
 
             sort_order = st.selectbox("Sort order?", options=["Descending", "Ascending"])
             ascending = sort_order == "Ascending"
 
+            rank_count = st.number_input("How many top / bottom values to highlight?", min_value=1, max_value=10, value=3)
+
+            # Large reports are charted as top / bottom N plus an "Other" bar
+            chart_mode = st.radio("Companies to chart:", options=["Top / Bottom N + Other", "All companies"], horizontal=True)
+            if chart_mode == "All companies":
+                top_n, bottom_n = None, 0
+            else:
+                n_col1, n_col2 = st.columns(2)
+                with n_col1:
+                    top_n = st.number_input("Top N", min_value=1, value=DEFAULT_TOP_N, step=5)
+                with n_col2:
+                    bottom_n = st.number_input("Bottom N", min_value=0, value=0, step=5)
+
             if st.button("📊 Generate Graph"):
-                # Reset the Excel bytes in session state
-                st.session_state.excel_bytes = None  # Clear the previous Excel file
+                # Point the export at this file / column / sort order
+                st.session_state.export_keys["tab1"] = ("tab1", st.session_state.uploaded_digest_tab1, column_to_graph, sort_order)
 
-                df = st.session_state.uploaded_df_tab1.copy()
-                df = df[["CompanyName", column_to_graph]].sort_values(by=column_to_graph, ascending=ascending)
+                # Unsorted subset; the full sort only happens for export or the all-companies chart.
+                # Ratio columns keep the columns they are weighted by, for the "Other" bar.
+                df = uploaded_df[["CompanyName"] + [col for col in ratio_inputs(column_to_graph) if col in uploaded_df.columns]]
 
                 # Store filtered for Excel export
-                st.session_state.filtered_df = df
+                set_frame("filtered_df", df)
+                st.session_state.filtered_sort = (column_to_graph, ascending)
 
-                if ascending:
-                    bottom3 = df.head(3)
-                    top3 = df.tail(3)
-                else:
-                    top3 = df.head(3)
-                    bottom3 = df.tail(3)
+                with timed("rank", rows=len(df), column=column_to_graph):
+                    top_rows, bottom_rows = top_and_bottom(df, column_to_graph, ascending, rank_count)
 
-                st.subheader("Top 3 Values")
-                top_cols = st.columns(3)
-                for i, row in enumerate((top3.itertuples(index=False))):
+                st.subheader(f"Top {rank_count} Values")
+                top_cols = st.columns(rank_count)
+                for i, row in enumerate((top_rows.itertuples(index=False))):
                     with top_cols[i]:
                         colored_metric(label=row.CompanyName, value=getattr(row, column_to_graph), color="#155724")  # Green
 
 
-                st.subheader("Bottom 3 Values")
-                bottom_cols = st.columns(3)
-                for i, row in enumerate(bottom3.itertuples(index=False)):
+                st.subheader(f"Bottom {rank_count} Values")
+                bottom_cols = st.columns(rank_count)
+                for i, row in enumerate(bottom_rows.itertuples(index=False)):
                     with bottom_cols[i]:
                         colored_metric(label=row.CompanyName, value=getattr(row, column_to_graph), color="#721c24")  # Red
 
                 st.markdown("---")  # Just a divider line for UX
 
-                fig = px.bar(
-                    df,
-                    x="CompanyName",
-                    y=column_to_graph,
-                    title=f"{column_to_graph} by CompanyName",
-                    labels={"CompanyName": "Company", column_to_graph: column_to_graph},
-                    color=column_to_graph,
-                    color_continuous_scale="Blues"
-                )
-                fig.update_layout(xaxis_tickangle=-45)
+                with timed("company_chart", rows=len(df), column=column_to_graph):
+                    fig = company_bar_chart(df, column_to_graph, top_n, bottom_n, ascending)
                 st.session_state.generated_graph = fig  # Store the graph in session state
 
             # Display the graph if it exists in session state
             if "generated_graph" in st.session_state and st.session_state.generated_graph is not None:
                 st.plotly_chart(st.session_state.generated_graph, use_container_width=True)
 
-            if st.session_state.filtered_df is not None:
-                st.markdown("---")  # Just a divider line for UX
-                st.subheader("🚀 View and export filtered data options:")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write('')
-                    # Checkbox to show processed subset preview
-                    show_processed = st.checkbox("🔬 Show Data Subset", value=False)
-                    if show_processed:
-                        if "filtered_df" in st.session_state:
-                            st.subheader("Data Subset (Filtered)")
-                            # Reset the index to exclude it from the display
-                            st.dataframe(st.session_state.filtered_df, hide_index=True)
-                        else:
-                            st.warning("No data available.")
-                with col2:
-                    # --------- EXCEL EXPORT ---------
-                    st.write('')
-                    if st.button("💾 Convert to Excel"):
-                        to_export = st.session_state.filtered_df
-
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            to_export.to_excel(writer, index=False, sheet_name="Export")
-                        output.seek(0)
-                        st.session_state.excel_bytes = output
-                        st.success("✅ CSV file converted to Excel file!")
-
-                    # If excel_bytes exists, show download button
-                    if st.session_state.excel_bytes:
-                        if st.download_button(
-                            label="⬇️ Download Excel File",
-                            data=st.session_state.excel_bytes,
-                            file_name="estestyle_exported_data.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        ):
-                            st.success("✅ Excel file downloaded!")
+            if "filtered_df" in st.session_state.frames:
+                filtered_data_panel()
 
-with tab2:
+@st.fragment
+def filtered_data_panel():
+    # Toggling the subset view or exporting only reruns this panel
+    st.markdown("---")  # Just a divider line for UX
+    st.subheader("🚀 View and export filtered data options:")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write('')
+        # Checkbox to show processed subset preview
+        show_processed = st.checkbox("🔬 Show Data Subset", value=False)
+        if show_processed:
+            filtered_df = get_frame("filtered_df")
+            if filtered_df is not None:
+                st.subheader("Data Subset (Filtered)")
+                sort_column, sort_ascending = st.session_state.filtered_sort
+                paginated_dataframe("data_subset", len(filtered_df), lambda start, stop: rank_window(filtered_df, sort_column, sort_ascending, start, stop))
+            else:
+                st.warning("No data available.")
+    with col2:
+        # --------- EXCEL EXPORT ---------
+        st.write('')
+        if st.button("💾 Convert to Excel"):
+            to_export = get_frame("filtered_df")
+            sort_column, sort_ascending = st.session_state.filtered_sort
+
+            with timed("excel_export", rows=len(to_export), view="tab1"):
+                get_export_cache().get_or_create(st.session_state.export_keys["tab1"], lambda: {"Export": rank_companies(to_export, sort_column, sort_ascending)})
+            st.success("✅ CSV file converted to Excel file!")
+
+        # If an exported workbook exists, show download button
+        excel_download("tab1", "⬇️ Download Excel File", "estestyle_exported_data.xlsx")
 
+@st.fragment
+def multi_csv_tab():
+    # Widgets in here only rerun this tab, never the single-file tab
     col1, col2, col3 = st.columns([1, 3, 1])
 
     with col2:
@@ -239,6 +616,7 @@ with tab2:
         # --------- FILE UPLOADER ---------
         st.subheader("📥 Download multiple files for analysis:")
         st.write('Minimum of 2 files must be loaded & file names must contain either "YYYY-MM" or "YYYY-MM-DD"')
+        st.caption("📦 .csv.gz files and .zip bundles are read member by member; each member's filename must carry its date.")
 
         # Add a unique key for the file uploader
         file_uploader_key = "file_uploader_default"
@@ -247,8 +625,10 @@ with tab2:
 
         if use_demo:
             # Reset uploaded files state
-            st.session_state.uploaded_data = {}  # Clear any previously uploaded files
+            clear_reports()  # Clear any previously uploaded files
             st.session_state.use_demo = True  # Mark demo mode as active
+            st.session_state.use_store = False
+            st.session_state.watch_dir = None
             file_uploader_key = "file_uploader_reset"  # Change the key to reset the file uploader
             successful_uploads = []  # List to store successfully uploaded filenames
 
@@ -261,80 +641,179 @@ with tab2:
                 "2025-02 Company Revenue Report.csv": "2025-02 Company Revenue Report.csv",
                 "2025-03 Company Revenue Report.csv": "2025-03 Company Revenue Report.csv",
             }
+            with timed("date_extraction", rows=len(demo_files)):
+                demo_dates = {filename: extract_report_date(filename) for filename in demo_files}
+
+            demo_sources = {}
             for filename, path in demo_files.items():
-                date_match_ymd = re.search(r"(\d{4}-\d{2}-\d{2})", filename)
-                date_match_ym = re.search(r"(\d{4}-\d{2})", filename)
-                if date_match_ymd:
-                    extracted_date = date_match_ymd.group(1)
-                elif date_match_ym:
-                    extracted_date = date_match_ym.group(1)
-                else:
-                    extracted_date = None
-                    st.warning(f"⚠️ Could not extract date from filename: {filename} (demo file).")
+                if demo_dates[filename] is None:
+                    load_notice("warning", f"⚠️ Could not extract date from filename: {filename} (demo file).")
                     continue
-                try:
-                    df = pd.read_csv(path)
-                    st.session_state.uploaded_data[filename] = {"df": df, "date": extracted_date}
-                    successful_uploads.append(filename)  # Add to the list of successful uploads
-                except Exception as e:
-                    st.error(f"🚨 Error reading demo file '{filename}': {e}")
+                demo_sources[filename] = path
+
+            loaded, errors = load_csvs_parallel(demo_sources, "Loading demo files")
+            demo_reports = {}
+            for filename, (df, digest) in loaded.items():
+                demo_reports[filename] = {"df": df, "date": demo_dates[filename], "digest": digest}
+                successful_uploads.append(filename)  # Add to the list of successful uploads
+            for filename, e in errors.items():
+                load_notice("error", f"🚨 Error reading demo file '{filename}': {e}")
+            add_reports(demo_reports)
 
             # Display a single success message with the total count of uploaded files
             if successful_uploads:
                 success_message = f"✅ **{len(successful_uploads)} Demo files successfully uploaded:**\n\n" + "\n".join(f"- {file}" for file in successful_uploads)
-                st.markdown(success_message)
+                load_notice("markdown", success_message)
+
+        # --------- LOCAL REPORT STORE ---------
+        with st.expander("🗄️ Local report store"):
+            st.caption(f"Ingest a server-side folder of Visual Matrix CSVs once into the report store ({vm_store.DEFAULT_STORE_DIR}). Re-ingesting only reads new or changed files.")
+            store_source_dir = st.text_input("📁 Folder containing Visual Matrix CSV exports", value=os.environ.get("VM_REPORT_DIR", ""))
+            if st.button("📥 Ingest Folder"):
+                if os.path.isdir(store_source_dir):
+                    ingest_result = vm_store.ingest_directory(store_source_dir)
+                    load_notice("success", f"✅ {len(ingest_result['ingested'])} files ingested, {len(ingest_result['unchanged'])} unchanged.")
+                    for filename in ingest_result["skipped"]:
+                        load_notice("warning", f"⚠️ Could not extract date from filename: {filename}. This file was not ingested.")
+                    for filename, error in ingest_result["errors"].items():
+                        load_notice("error", f"🚨 Error reading CSV file '{filename}': {error}")
+                    if st.session_state.use_store and ingest_result["ingested"]:
+                        st.session_state.report_set_changed = True
+                else:
+                    st.error(f"🚨 Folder not found: {store_source_dir}")
+
+            if st.button("🗄️ Use Report Store"):
+                st.session_state.use_store = True
+                st.session_state.use_demo = False
+                clear_reports()  # Stored reports are read per column on demand
+                file_uploader_key = "file_uploader_reset"
+
+            if st.session_state.watch_dir is None and st.button("👀 Watch Folder"):
+                if os.path.isdir(store_source_dir):
+                    # New or changed exports dropped into the folder are ingested and charted automatically
+                    st.session_state.watch_dir = os.path.abspath(store_source_dir)
+                    st.session_state.use_store = True
+                    st.session_state.use_demo = False
+                    clear_reports()
+                    file_uploader_key = "file_uploader_reset"
+                    get_watcher(st.session_state.watch_dir).poll(force=True)
+                else:
+                    st.error(f"🚨 Folder not found: {store_source_dir}")
+
+            if st.session_state.watch_dir is not None and st.button("⏹️ Stop Watching"):
+                st.session_state.watch_dir = None
+
+            if st.session_state.use_store:
+                st.info("Using the report store. Uploading files or selecting the demo files will reset this option.")
+
+        if st.session_state.watch_dir is not None:
+            watched_folder_status()
 
         # File uploader with dynamic key
         uploaded_files = st.file_uploader(
             "📄 Select Multiple Visual Matrix output CSVs to analyze",
-            type="csv",
+            type=REPORT_UPLOAD_TYPES,
             accept_multiple_files=True,
             key=file_uploader_key,  # Use the dynamic key
         )
 
-        if uploaded_files:
+        if uploaded_files or st.session_state.upload_ids:
+            if st.session_state.use_demo or st.session_state.use_store:
+                clear_reports()  # Switching away from the demo files / report store
             # Reset demo file state
             st.session_state.use_demo = False  # Mark demo mode as inactive
-            st.session_state.uploaded_data = {}  # Clear any previously loaded demo files
+            st.session_state.use_store = False
+            st.session_state.watch_dir = None
+
+            # Files are tracked by uploader file_id: only newly added files are read, and
+            # removed ones are evicted along with their per-date sums
+            current_files = {uploaded_file.file_id: uploaded_file for uploaded_file in uploaded_files or []}
+            removed_ids = [file_id for file_id in st.session_state.upload_ids if file_id not in current_files]
+            if removed_ids:
+                removed_names = set().union(*(st.session_state.upload_ids.pop(file_id) for file_id in removed_ids))
+                remove_reports(removed_names)
+                # A remaining upload holding a report of the same name is loaded again below
+                for file_id, filenames in list(st.session_state.upload_ids.items()):
+                    if removed_names.intersection(filenames):
+                        del st.session_state.upload_ids[file_id]
+            new_files = [uploaded_file for file_id, uploaded_file in current_files.items() if file_id not in st.session_state.upload_ids]
 
             successful_uploads = []  # List to store successfully uploaded filenames
 
-            for uploaded_file in uploaded_files:
-                filename = uploaded_file.name
-                date_match_ymd = re.search(r"(\d{4}-\d{2}-\d{2})", filename)
-                date_match_ym = re.search(r"(\d{4}-\d{2})", filename)
-
-                if date_match_ymd:
-                    extracted_date = date_match_ymd.group(1)
-                elif date_match_ym:
-                    extracted_date = date_match_ym.group(1)
-                else:
-                    extracted_date = None
-                    st.warning(f"⚠️ Could not extract date from filename: {filename}. This file will not be used for the time-based graph.")
-                    continue
-
+            # Archives are listed from their zip directory first, so undated members are
+            # skipped without being decompressed
+            upload_members = {}  # file_id -> report filenames inside that upload
+            for uploaded_file in new_files:
+                st.session_state.upload_ids[uploaded_file.file_id] = ()  # Seen, even if nothing in it can be used
                 try:
-                    df = pd.read_csv(uploaded_file).reset_index(drop=True)
-                    st.session_state.uploaded_data[filename] = {"df": df, "date": extracted_date}
-                    successful_uploads.append(filename)  # Add to the list of successful uploads
-                except Exception as e:
-                    st.error(f"🚨 Error reading CSV file '{filename}': {e}")
+                    upload_members[uploaded_file.file_id] = report_member_names(uploaded_file.name, uploaded_file)
+                except (zipfile.BadZipFile, OSError) as e:
+                    load_notice("error", f"🚨 Error reading archive '{uploaded_file.name}': {e}")
+
+            if upload_members:
+                with timed("date_extraction", rows=sum(len(filenames) for filenames in upload_members.values())):
+                    upload_dates = {filename: extract_report_date(filename) for filenames in upload_members.values() for filename in filenames}
+
+            for file_id, filenames in upload_members.items():
+                for filename in filenames:
+                    if upload_dates[filename] is None:
+                        load_notice("warning", f"⚠️ Could not extract date from filename: {filename}. This file will not be used for the time-based graph.")
+                upload_members[file_id] = {filename for filename in filenames if upload_dates[filename] is not None}
+
+            def upload_sources():
+                # Members are decompressed by the worker that parses them, a few at a time
+                for uploaded_file in new_files:
+                    dated = upload_members.get(uploaded_file.file_id)
+                    if dated:
+                        for filename, read in iter_report_members(uploaded_file.name, uploaded_file, accept=dated.__contains__):
+                            yield (uploaded_file.file_id, filename), read
+
+            member_count = sum(len(filenames) for filenames in upload_members.values())
+            if member_count:
+                loaded, errors = load_csvs_parallel(upload_sources(), "Reading uploaded files", load=lambda read: load_csv_with_digest(read()), total=member_count)
+            else:
+                loaded, errors = {}, {}
+            new_reports = {}
+            for (file_id, filename), (df, digest) in loaded.items():
+                st.session_state.upload_ids[file_id] += (filename,)
+                current = st.session_state.uploaded_data.get(filename)
+                if current is None or current["digest"] != digest:  # Same name + content is already summed
+                    new_reports[filename] = {"df": df, "date": upload_dates[filename], "digest": digest}
+                successful_uploads.append(filename)  # Add to the list of successful uploads
+            for (file_id, filename), e in errors.items():
+                load_notice("error", f"🚨 Error reading CSV file '{filename}': {e}")
+            if new_reports:
+                add_reports(new_reports)
 
             # Display a single success message with the total count of uploaded files
             if successful_uploads:
                 success_message = f"✅ **{len(successful_uploads)} files successfully uploaded:**\n\n" + "\n".join(f"- {file}" for file in successful_uploads)
-                st.markdown(success_message)
+                load_notice("markdown", success_message)
+            if st.session_state.uploaded_data:
+                st.caption(f"📚 {len(st.session_state.uploaded_data)} files loaded.")
+
+        # Messages from the load that triggered this rerun
+        for kind, message in st.session_state.carried_notices:
+            getattr(st, kind)(message)
+        st.session_state.carried_notices = []
 
         # --------- UI OPTIONS ---------
-        if len(st.session_state.uploaded_data) >= 2:
+        if st.session_state.use_store:
+            report_count = len(vm_store.load_manifest()["files"])
+        else:
+            report_count = len(st.session_state.uploaded_data)
+
+        if report_count >= 2:
             st.markdown("---")  # Divider line for UX
             st.subheader("🔍 Data references for graph:")
             st.write("")
 
-            all_columns = set()
-            for file_data in st.session_state.uploaded_data.values():
-                if 'df' in file_data:
-                    all_columns.update(file_data['df'].columns)
+            if st.session_state.use_store:
+                all_columns = vm_store.store_columns()
+            else:
+                all_columns = set()
+                for file_data in st.session_state.uploaded_data.values():
+                    all_columns.update(file_data["columns"])
 
             if all_columns:
                 # Filter out potential non-data columns (you might need to adjust this list)
@@ -345,175 +824,172 @@ with tab2:
                         options=valid_columns,
                     )
 
+                    granularities = available_granularities(report_dates())
+                    granularity = st.radio(
+                        "Time granularity",
+                        options=granularities,
+                        index=0 if granularities[0] == "Daily" else granularities.index("Monthly"),
+                        horizontal=True,
+                        key="granularity",
+                    )
+
                     if st.button("📊 Create Graph"):
-    
-                        # Reset the Excel bytes in session state
-                        st.session_state.excel_bytes = None  # Clear the previous Excel file
-
-                        graph_data = []
-                        for filename, data in st.session_state.uploaded_data.items():
-                            if 'df' in data and 'date' in data and data['date'] and column_to_graph in data['df'].columns:
-                                summed_value = data['df'][column_to_graph].sum()
-                                graph_data.append({"Date": data['date'], "Summed Value": summed_value, "Filename": filename})
-
-                        if graph_data:
-                            comparison_df_time = pd.DataFrame(graph_data)
-                            comparison_df_time = comparison_df_time.sort_values(by="Date")
-                            # Store filtered for Excel export
-                            st.session_state.comparison_df_time = comparison_df_time
-
-                            # Bar Chart
-                            fig_bar = px.bar(
-                                comparison_df_time,
-                                x="Date",  # Use Date as the x-axis
-                                y="Summed Value",
-                                title=f"Comparison of {column_to_graph} Sum Over Time",
-                                labels={"Summed Value": f"Sum of {column_to_graph}"},
-                                color="Filename",  # Differentiate bars by file
-                            )
-
-                            # Update layout to ensure no gaps for missing dates
-                            fig_bar.update_layout(
-                                xaxis=dict(
-                                    type="category",  # Treat the x-axis as categorical
-                                    categoryorder="array",  # Ensure the order matches the data
-                                    categoryarray=comparison_df_time['Date'].tolist(),  # Dynamically set the order of dates
-                                ),
-                                yaxis_title=f"Sum of {column_to_graph}",
-                                xaxis_tickangle=-45,
-                                showlegend=False,  # Hide the legend completely
-                            )
-
-                            st.plotly_chart(fig_bar, use_container_width=True)
-
-                            
-                            # Ensure the Date column is treated as a string (categorical)
-                            comparison_df_time['Date'] = comparison_df_time['Date'].astype(str)
-
-                            # Sort by Date to ensure the points are ordered
-                            comparison_df_time = comparison_df_time.sort_values(by="Date")
-
-                            # Create the scatter plot with the correct color (Plotly automatically handles this)
-                            fig_line = px.scatter(
-                                comparison_df_time,
-                                x="Date",
-                                y="Summed Value",
-                                title=f"Trend of {column_to_graph} Sum Over Time",
-                                labels={"Summed Value": f"Sum of {column_to_graph}"},
-                                color="Filename",  # Separate lines for each file, Plotly handles colors
-                            )
-
-                            # Add the connecting line manually, ensuring the same color for the line and markers
-                            for trace in fig_line.data:
-                                trace.marker.color = trace.line.color  # Ensure marker color matches the line color
-
-                            # Add the connecting line manually
-                            fig_line.add_trace(go.Scatter(
-                                x=comparison_df_time['Date'],
-                                y=comparison_df_time['Summed Value'],
-                                mode='lines+markers',  # Connect the dots with lines and show markers
-                                line=dict(shape='linear', color="skyblue"),  # Use color from first trace
-                                marker=dict(color=fig_line.data[0].marker.color),  # Use color from first trace
-                                showlegend=False,  # Hide legend for the lines (or customize as needed)
-                            ))
-
-                            # Update layout to treat x-axis as categorical
-                            fig_line.update_layout(
-                                xaxis=dict(
-                                    type="category",  # Make the x-axis categorical (no date gaps)
-                                    categoryorder="array",  # Ensure the order matches the data
-                                    categoryarray=comparison_df_time['Date'].tolist(),  # Explicitly set the order of categories
-                                    tickmode='array',
-                                    tickvals=comparison_df_time['Date'].tolist(),  # Only show ticks for actual dates
-                                    ticktext=comparison_df_time['Date'].tolist(),  # Display actual dates as tick labels
-                                ),
-                                yaxis_title=f"Sum of {column_to_graph}",
-                                xaxis_tickangle=-45,
-                                showlegend=False,  # Hide the legend completely
-                            )
-
-                            st.plotly_chart(fig_line, use_container_width=True)
-
-                            # Extract the month name and year from the Date column
-                            comparison_df_time['Month'] = pd.to_datetime(comparison_df_time['Date']).dt.strftime('%B')  # Extract month name
-                            comparison_df_time['Year'] = pd.to_datetime(comparison_df_time['Date']).dt.year  # Extract year for coloring
-
-                            # Dynamically sort by Month based on the data present
-                            unique_months = comparison_df_time['Month'].unique()
-                            comparison_df_time['Month'] = pd.Categorical(comparison_df_time['Month'], categories=unique_months, ordered=True)
-                            comparison_df_time = comparison_df_time.sort_values(by="Month")
-
-                            # Create the scatter plot with Month as the x-axis
-                            fig_line = px.scatter(
-                                comparison_df_time,
-                                x="Month",  # Use Month as the x-axis
-                                y="Summed Value",
-                                title=f"Comparison of {column_to_graph} by Month",
-                                labels={"Summed Value": f"Sum of {column_to_graph}"},
-                                color="Year",  # Differentiate points by year
-                            )
-
-                            # Add connecting lines for each year
-                            for year in comparison_df_time['Year'].unique():
-                                year_data = comparison_df_time[comparison_df_time['Year'] == year]
-                                fig_line.add_trace(go.Scatter(
-                                    x=year_data['Month'],
-                                    y=year_data['Summed Value'],
-                                    mode='lines+markers',
-                                    name=f"{year}",  # Legend entry for the year
-                                    line=dict(shape='linear'),
-                                    marker=dict(size=8),
-                                ))
-
-                            # Update layout to ensure proper spacing and ordering
-                            fig_line.update_layout(
-                                xaxis=dict(
-                                    categoryorder="array",  # Ensure months are ordered correctly
-                                    categoryarray=unique_months,  # Dynamically set the order of months
-                                ),
-                                yaxis_title=f"Sum of {column_to_graph}",
-                                xaxis_tickangle=-45,
-                                showlegend=True,  # Show legend to differentiate years
-                                coloraxis_showscale=False  # Disable the color bar
-                            )
-
-                            st.plotly_chart(fig_line, use_container_width=True)
-
-
-                    if st.session_state.comparison_df_time is not None:
-                        st.markdown("---")  # Just a divider line for UX
-                        
-                        st.subheader("🚀 View and export filtered data options:")
-
-                        col1, col2 = st.columns(2)
-                            
-                        with col1:
-                            st.write('')
-                        
-                            # Checkbox to show processed subset preview
-                            show_calc_val = st.checkbox("🔬 Show Calculated Data", value=False)
-                            if show_calc_val:
-                                st.subheader("Calculated Sums")
-                                # Display the DataFrame with Date, Summed Value, and Filename
-                                st.dataframe(st.session_state.comparison_df_time, hide_index=True)
-                                
-                        with col2:
-                            st.write('')
-                            if st.button("💾 Export Calculated Data to Excel"):
-                                output = io.BytesIO()
-                                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                                    st.session_state.comparison_df_time.to_excel(writer, index=False, sheet_name="Calculated Data")
-                                output.seek(0)
-                                st.session_state.excel_bytes = output
-                                st.success("✅ Calculated data converted to Excel file!")
-
-                            if st.session_state.excel_bytes:
-                                if st.download_button(
-                                    label="⬇️ Download Calculated Data as Excel",
-                                    data=st.session_state.excel_bytes,
-                                    file_name="estestyle_calculated_data.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                ):
-                                    st.success("✅ Excel file downloaded!")
+                        st.session_state.graphed_column = column_to_graph
+
+                    # Kept across reruns, so switching granularity or a watched-folder refresh redraws at once
+                    if st.session_state.graphed_column in valid_columns:
+                        time_series_charts(st.session_state.graphed_column, granularity)
+
+                    if "comparison_df_time" in st.session_state.frames:
+                        calculated_data_panel()
             else:
                 st.warning("⚠️ No valid columns found in the uploaded files to analyze (excluding 'CompanyName' and 'CompanyCode').")
+
+    # The account trends tab only reads what this tab loads
+    rerun_if_report_set_changed()
+
+@st.fragment
+def calculated_data_panel():
+    # Toggling the calculated view or exporting only reruns this panel
+    st.markdown("---")  # Just a divider line for UX
+
+    st.subheader("🚀 View and export filtered data options:")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write('')
+
+        # Checkbox to show processed subset preview
+        show_calc_val = st.checkbox("🔬 Show Calculated Data", value=False)
+        if show_calc_val:
+            calculated_df = get_frame("comparison_df_time")
+            # Ratio columns (ADR, RevPAR, ...) are weighted averages rather than sums
+            st.subheader("Calculated Weighted Averages" if "Weighted Avg" in calculated_df.columns else "Calculated Sums")
+            # Display the DataFrame with Date, Summed Value (or Weighted Avg), and Filename
+            paginated_dataframe("calculated_data", len(calculated_df), lambda start, stop: calculated_df.iloc[start:stop])
+
+        show_analytics = st.checkbox("📈 Show Period Analytics", value=False)
+        if show_analytics:
+            st.subheader("Period Analytics")
+            analytics_df = get_frame("period_analytics")
+            paginated_dataframe("period_analytics", len(analytics_df), lambda start, stop: analytics_df.iloc[start:stop])
+
+    with col2:
+        st.write('')
+        if st.button("💾 Export Calculated Data to Excel"):
+            to_export = get_frame("comparison_df_time")
+            analytics_df = get_frame("period_analytics")
+            with timed("excel_export", rows=len(to_export), view="tab2"):
+                get_export_cache().get_or_create(st.session_state.export_keys["tab2"], lambda: {
+                    "Calculated Data": to_export,
+                    f"{st.session_state.granularity} Totals": get_frame("date_rollup"),
+                    "Period Analytics": analytics_df,
+                })
+            st.success("✅ Calculated data converted to Excel file!")
+
+        excel_download("tab2", "⬇️ Download Calculated Data as Excel", "estestyle_calculated_data.xlsx")
+
+@st.fragment
+def account_trends_tab():
+    # Queries the company × period index built as reports are loaded in the multi-file tab
+    col1, col2, col3 = st.columns([1, 3, 1])
+
+    with col2:
+        st.header("Account Trends by Company")
+        st.markdown("---")  # Just a divider line for UX
+
+        index, names = current_company_index()
+        if index is None or not len(index):
+            st.info("Load dated reports in the Multi CSV tab (or use the report store) to see account trends.")
+            return
+        dates = index_dates(index)
+
+        # --------- ACCOUNT TRENDS ---------
+        st.subheader("📈 Compare accounts over time:")
+        column_to_graph = st.selectbox("Which data column do you want to analyze?", options=list(index.columns), key="account_column")
+        accounts = st.multiselect(
+            "Accounts to compare",
+            options=names.sort_values(by="CompanyName").index.tolist(),
+            format_func=lambda code: f"{names.at[code, 'CompanyName']} ({code})",
+            key="account_codes",
+        )
+        if accounts:
+            with timed("account_trends", column=column_to_graph) as record:
+                trends = company_trends(index, column_to_graph, accounts, names)
+                record["rows"] = len(trends)
+            st.plotly_chart(account_trend_chart(trends, column_to_graph), use_container_width=True)
+
+        # --------- TOP MOVERS ---------
+        st.markdown("---")  # Just a divider line for UX
+        st.subheader("🚀 Top movers between two periods:")
+        if len(dates) < 2:
+            st.info("Top movers need reports from at least two dates.")
+            return
+        start, end = st.select_slider("Periods to compare", options=dates, value=(dates[0], dates[-1]), key="movers_range")
+        mover_count = st.number_input("How many movers to show each way?", min_value=1, max_value=50, value=10, key="movers_count")
+
+        with timed("top_movers", column=column_to_graph) as record:
+            gainers, decliners = top_movers(index, column_to_graph, start, end, mover_count, names)
+            record["rows"] = len(gainers) + len(decliners)
+        if gainers.empty and decliners.empty:
+            st.info(f"No account changed in {column_to_graph} between {start} and {end}.")
+            return
+        st.plotly_chart(top_movers_chart(gainers, decliners, column_to_graph), use_container_width=True)
+
+        gain_col, decline_col = st.columns(2)
+        with gain_col:
+            st.caption("Biggest gains")
+            st.dataframe(gainers, hide_index=True)
+        with decline_col:
+            st.caption("Biggest declines")
+            st.dataframe(decliners, hide_index=True)
+
+with tab1:
+    single_csv_tab()
+
+with tab2:
+    multi_csv_tab()
+
+with tab3:
+    account_trends_tab()
+
+# --------- DIAGNOSTICS SIDEBAR ---------
+# Most interactions only rerun a tab's fragment, which never reaches this sidebar, so
+# the panel is a fragment of its own that redraws on a timer while it is open
+DIAGNOSTICS_REFRESH_SECONDS = 2
+
+@st.fragment(run_every=DIAGNOSTICS_REFRESH_SECONDS)
+def diagnostics_panel():
+    st.subheader("Stage timings")
+    if st.session_state.stage_metrics:
+        st.dataframe(
+            [
+                {
+                    "Stage": record["stage"],
+                    "Time (ms)": round(record["seconds"] * 1000, 1),
+                    "Rows": record.get("rows"),
+                    "Memory Δ (MB)": None if record["memory_delta_bytes"] is None else round(record["memory_delta_bytes"] / 1_048_576, 1),
+                }
+                for record in reversed(st.session_state.stage_metrics)
+            ],
+            hide_index=True,
+        )
+        if st.button("🧹 Clear diagnostics"):
+            st.session_state.stage_metrics.clear()
+    else:
+        st.caption("No stages timed yet. Generate a graph or export to see timings.")
+
+    st.subheader("Session memory")
+    frames = st.session_state.frames
+    st.caption(
+        f"{frames.resident_bytes() / 1_048_576:.1f} MB in memory, "
+        f"{frames.spilled_bytes() / 1_048_576:.1f} MB spilled to disk "
+        f"({len(frames.spilled_keys())} of {len(frames)} frames)"
+    )
+    parse_cache = get_parse_cache()
+    st.caption(f"Shared parse cache: {parse_cache.total_bytes() / 1_048_576:.1f} MB in {len(parse_cache)} frames")
+
+with st.sidebar:
+    if st.checkbox("🩺 Show diagnostics", value=False):
+        diagnostics_panel()
@@ -0,0 +1,108 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# --------- SYNTHETIC VISUAL MATRIX REPORTS ---------
+# Writes Company Revenue Reports with the same 16 columns as the Visual Matrix export.
+# Companies come from one shared pool so accounts recur across months like real data,
+# and the derived columns keep the export's relationships:
+#   TotalRev = RoomRev + FBRev + OtherRev, ADR = RoomRev / NoOfNights,
+#   ATR = TotalRev / NoOfNights, AvgStayLength = NoOfNights / Arrivals
+#
+#   python benchmarks/generate_reports.py <output folder> --files 12 --rows 1000 [--daily]
+
+NAME_WORDS = [
+    "GLOBAL", "MEDICAL", "TRAVEL", "LODGING", "SERVICES", "TECHNOLOGIES", "INTERNATIONAL",
+    "ENGINEERING", "LOGISTICS", "CONSTRUCTION", "ENERGY", "HEALTH", "PARTNERS", "SOLUTIONS",
+    "RAIL", "AVIATION", "STAFFING", "FOODS", "SUPPLY", "SYSTEMS", "GROUP", "HOLDINGS",
+]
+NAME_SUFFIXES = ["INC", "LLC", "CORP", "CO", "LP", "LTD"]
+TAX_RATE = 0.0865
+
+
+def company_pool(size, rng):
+    words = rng.choice(NAME_WORDS, size=(size, 2))
+    suffixes = rng.choice(NAME_SUFFIXES, size=size)
+    names = [f"{a} {b} {suffix} {i:05d}" for i, (a, b), suffix in zip(range(size), words, suffixes)]
+    codes = [f"{code:08d}" for code in rng.choice(100_000_000, size=size, replace=False)]
+    return pd.DataFrame({"CompanyName": names, "CompanyCode": codes})
+
+
+def generate_report(rows, rng, companies):
+    picked = companies.iloc[rng.choice(len(companies), size=min(rows, len(companies)), replace=False)]
+    n = len(picked)
+    arrivals = rng.poisson(3, n)
+    stay = rng.gamma(1.5, 1.0, n) + 1
+    nights = np.where(arrivals > 0, np.maximum(arrivals, np.round(arrivals * stay)), 0).astype(int)
+    adults = arrivals + rng.binomial(arrivals, 0.3)
+    children = rng.binomial(arrivals, 0.1)
+    adr = np.round(rng.normal(95, 20, n).clip(45, 260), 2)
+    room_rev = np.round(adr * nights, 2)
+    fb_rev = np.round(np.where(rng.random(n) < 0.1, rng.gamma(2, 20, n), 0) * (nights > 0), 2)
+    other_rev = np.round(room_rev * TAX_RATE, 2)
+    total_rev = np.round(room_rev + fb_rev + other_rev, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adr = np.where(nights > 0, np.round(room_rev / nights, 2), 0.0)
+        atr = np.where(nights > 0, np.round(total_rev / nights, 2), 0.0)
+        stay_length = np.where(arrivals > 0, np.round(nights / arrivals, 2), 0.0)
+    lead_time = np.where(arrivals > 0, np.round(rng.gamma(1.5, 8, n) - 1, 2), 0.0)
+    lost_nights = rng.poisson(0.5, n)
+    lost_rev = np.round(lost_nights * rng.normal(85, 10, n).clip(40, 200), 2)
+
+    return pd.DataFrame({
+        "CompanyName": picked["CompanyName"].to_numpy(),
+        "CompanyCode": picked["CompanyCode"].to_numpy(),
+        "Arrivals": arrivals,
+        "NoOfNights": nights,
+        "Adults": adults,
+        "Children": children,
+        "RoomRev": room_rev,
+        "FBRev": fb_rev,
+        "OtherRev": other_rev,
+        "TotalRev": total_rev,
+        "AvgLeadTime": lead_time,
+        "AvgStayLength": stay_length,
+        "ADR": adr,
+        "ATR": atr,
+        "LostNights": lost_nights,
+        "LostRev": lost_rev,
+    })
+
+
+def report_dates(files, daily=False, start="2024-01-01"):
+    if daily:
+        return [d.strftime("%Y-%m-%d") for d in pd.date_range(start, periods=files, freq="D")]
+    return [d.strftime("%Y-%m") for d in pd.date_range(start, periods=files, freq="MS")]
+
+
+def write_reports(output_dir, files=12, rows=1000, daily=False, start="2024-01-01", companies=None, seed=0):
+    rng = np.random.default_rng(seed)
+    pool = company_pool(companies or max(rows * 2, 50), rng)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for report_date in report_dates(files, daily, start):
+        path = os.path.join(output_dir, f"{report_date} Company Revenue Report.csv")
+        generate_report(rows, rng, pool).to_csv(path, index=False, float_format="%.2f")
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic Visual Matrix Company Revenue Reports.")
+    parser.add_argument("output_dir", help="Folder to write the CSVs to")
+    parser.add_argument("--files", type=int, default=12, help="Number of reports")
+    parser.add_argument("--rows", type=int, default=1000, help="Companies per report")
+    parser.add_argument("--companies", type=int, default=None, help="Size of the shared company pool (default 2 x rows)")
+    parser.add_argument("--daily", action="store_true", help="YYYY-MM-DD daily reports instead of YYYY-MM monthly ones")
+    parser.add_argument("--start", default="2024-01-01", help="Date of the first report")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = write_reports(args.output_dir, args.files, args.rows, args.daily, args.start, args.companies, args.seed)
+    print(f"{len(paths)} reports written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
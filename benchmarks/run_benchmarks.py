@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_reports import write_reports  # noqa: E402
+from vm_charts import (  # noqa: E402
+    company_bar_chart, date_bar_chart, date_trend_chart, month_comparison_chart, period_change_chart, rolling_trend_chart,
+)
+from vm_engine import (  # noqa: E402
+    aggregate_by_date, column_by_date, date_rollups, rollup_view, company_period_index, company_rows, period_analytics, rank_companies, top_and_bottom,
+)
+from vm_export import spool_workbook, remove_spooled  # noqa: E402
+from vm_reader import extract_report_date, read_vm_csv  # noqa: E402
+
+# --------- PIPELINE BENCHMARKS ---------
+# Times each stage of the app's pipeline on synthetic reports and compares the best of
+# --repeat runs against benchmarks/baseline.json:
+#
+#   python benchmarks/run_benchmarks.py --scale medium                 # compare
+#   python benchmarks/run_benchmarks.py --scale medium --save-baseline # record
+#
+# A stage regresses when it is both TOLERANCE slower and MIN_REGRESSION_SECONDS slower
+# than its baseline, so sub-millisecond noise never fails a run.
+SCALES = {
+    "small": {"files": 12, "rows": 1_000},
+    "medium": {"files": 36, "rows": 20_000},
+    "large": {"files": 365, "rows": 5_000, "daily": True},
+    "huge": {"files": 24, "rows": 1_000_000},
+}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.005
+COLUMN = "TotalRev"
+
+
+def dataset_dir(scale):
+    # Generated reports are reused between runs of the same scale
+    params = SCALES[scale]
+    path = os.path.join(tempfile.gettempdir(), f"vm_bench_{scale}")
+    if not os.path.isdir(path) or len(os.listdir(path)) != params["files"]:
+        write_reports(path, params["files"], params["rows"], params.get("daily", False))
+    return path
+
+
+def best_of(repeat, stage):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(scale, repeat=3):
+    source_dir = dataset_dir(scale)
+    paths = sorted(os.path.join(source_dir, name) for name in os.listdir(source_dir))
+    filenames = [os.path.basename(path) for path in paths]
+
+    reports = {}
+
+    def ingest():
+        reports.clear()
+        for path in paths:
+            reports[os.path.basename(path)] = {"df": read_vm_csv(path), "date": None}
+
+    def date_extraction():
+        for filename in filenames:
+            reports[filename]["date"] = extract_report_date(filename)
+
+    largest = {}
+
+    def ranking():
+        df = max((data["df"] for data in reports.values()), key=len)
+        largest["df"] = df
+        top_and_bottom(df, COLUMN, count=3)
+        largest["ranked"] = rank_companies(df, COLUMN)
+
+    aggregated = {}
+
+    def aggregation():
+        aggregated["sums"] = aggregate_by_date(reports)
+        aggregated["view"] = column_by_date(aggregated["sums"], COLUMN)
+
+    def rollups():
+        aggregated["rollup"] = rollup_view(date_rollups(aggregated["sums"])["Monthly"], COLUMN)
+
+    def analytics():
+        aggregated["analytics"] = period_analytics(aggregated["sums"], COLUMN)
+
+    def company_index():
+        company_period_index(company_rows(reports))
+
+    def figures():
+        for fig in (
+            company_bar_chart(largest["df"], COLUMN, top_n=20),
+            date_bar_chart(aggregated["rollup"], COLUMN),
+            date_trend_chart(aggregated["rollup"], COLUMN),
+            month_comparison_chart(aggregated["analytics"], COLUMN),
+        ):
+            fig.to_json()  # Include serialization: it is what the browser is sent
+
+    def period_figures():
+        for fig in (
+            period_change_chart(aggregated["analytics"], COLUMN),
+            rolling_trend_chart(aggregated["analytics"], COLUMN),
+        ):
+            fig.to_json()
+
+    def export():
+        remove_spooled(spool_workbook({"Export": largest["ranked"], "Calculated Data": aggregated["view"]}))
+
+    stages = {}
+    for name, stage in [
+        ("csv_ingest", ingest),
+        ("date_extraction", date_extraction),
+        ("ranking", ranking),
+        ("per_date_aggregation", aggregation),
+        ("date_rollups", rollups),
+        ("period_analytics", analytics),
+        ("company_index", company_index),
+        ("figure_construction", figures),
+        ("period_figures", period_figures),
+        ("excel_export", export),
+    ]:
+        stages[name] = best_of(repeat, stage)
+
+    total_rows = sum(len(data["df"]) for data in reports.values())
+    return {"scale": scale, "files": len(paths), "rows": total_rows, "stages": stages}
+
+
+def compare(result, baseline):
+    regressions = []
+    for name, seconds in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            continue
+        if seconds > previous * (1 + TOLERANCE) and seconds - previous > MIN_REGRESSION_SECONDS:
+            regressions.append((name, previous, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Visual Matrix report pipeline.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best time is kept")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the baseline for its scale")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.scale, args.repeat)
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.scale, {})
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['scale']}: {result['files']} files, {result['rows']} rows")
+        for name, seconds in result["stages"].items():
+            previous = baseline.get("stages", {}).get(name)
+            change = f"  ({(seconds / previous - 1) * 100:+.0f}% vs baseline)" if previous else "  (not in baseline)"
+            print(f"  {name:<22}{seconds * 1000:>10.1f} ms{change}")
+
+    if args.save_baseline:
+        baselines[args.scale] = result
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline for '{args.scale}' saved to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(result, baseline)
+    for name, previous, seconds in regressions:
+        print(f"REGRESSION {name}: {previous * 1000:.1f} ms -> {seconds * 1000:.1f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from vm_charts import bucket_companies
+
+
+def test_other_bar_is_a_weighted_mean_for_ratio_columns():
+    df = pd.DataFrame({
+        "CompanyName": ["A", "B", "C"],
+        "ADR": [200.0, 100.0, 50.0],
+        "RoomRev": [2000.0, 100.0, 450.0],
+        "NoOfNights": [10, 1, 9],
+    })
+    chart_df = bucket_companies(df, "ADR", top_n=1)
+    # (100 + 450) / (1 + 9), not the plain mean of 100 and 50
+    assert chart_df["ADR"].iloc[-1] == pytest.approx(55.0)
+    assert chart_df["CompanyName"].iloc[-1] == "Other (2 companies, weighted avg)"
+
+
+def test_other_bar_sums_summed_columns():
+    df = pd.DataFrame({"CompanyName": ["A", "B", "C"], "RoomRev": [2000.0, 100.0, 450.0]})
+    assert bucket_companies(df, "RoomRev", top_n=1)["RoomRev"].iloc[-1] == pytest.approx(550.0)
@@ -0,0 +1,180 @@
+import math
+import os
+
+import pandas as pd
+
+from vm_engine import (
+    aggregate_by_date, available_granularities, column_by_date, company_names, company_period_index, company_rows, date_rollups,
+    main, period_analytics, rank_companies, rank_window, ratio_parts, rollup_view, run_batch, sum_by, top_movers,
+    update_aggregates,
+)
+
+
+def report(date, **columns):
+    return {"df": pd.DataFrame(columns), "date": date}
+
+
+def test_company_rows_skips_reports_without_company_code():
+    reports = {
+        "2024-01 Rooms.csv": report("2024-01", Rooms=[1, 2], Rev=[3.0, 4.0]),
+        "2024-02 Rooms.csv": report("2024-02", Rooms=[5, 6], Rev=[7.0, 8.0]),
+    }
+    rows = update_aggregates(None, added=reports, aggregate=company_rows)
+    assert company_period_index(rows).empty
+    assert company_names(rows).empty
+    # The per-date sums of the same reports are unaffected
+    assert aggregate_by_date(reports)["Rooms"].tolist() == [3, 11]
+
+
+def test_company_rows_indexes_only_reports_with_company_code():
+    reports = {
+        "2024-01 Rooms.csv": report("2024-01", Rooms=[1, 2]),
+        "2024-02 Accounts.csv": report("2024-02", CompanyCode=["0385", "0166"], Rooms=[3, 4]),
+        "2024-03 Accounts.csv": report("2024-03", CompanyCode=["0385"], CompanyName=["ABC Travel"], Rooms=[5]),
+    }
+    index = company_period_index(company_rows(reports))
+    assert index["Rooms"].to_dict() == {("0166", "2024-02"): 4, ("0385", "2024-02"): 3, ("0385", "2024-03"): 5}
+    # Accounts without a name in any report go by their code
+    assert company_names(company_rows(reports))["CompanyName"].to_dict() == {"0166": "0166", "0385": "ABC Travel"}
+
+
+def test_top_movers_with_a_metric_missing_from_one_period():
+    reports = {
+        "2024-01 Accounts.csv": report("2024-01", CompanyCode=["0385", "0166"], Rooms=[3, 4]),
+        "2024-02 Accounts.csv": report("2024-02", CompanyCode=["0385", "0166"], Rooms=[5, 4], LostRev=[10.0, 0.0]),
+    }
+    index = company_period_index(company_rows(reports))
+    gainers, decliners = top_movers(index, "LostRev", "2024-01", "2024-02")
+    # Summed metric: absent in January counts as 0
+    assert gainers["CompanyCode"].tolist() == ["0385"] and decliners.empty
+    gainers, decliners = top_movers(index, "LostRev", "2024-02", "2024-01")
+    assert gainers.empty and decliners["CompanyCode"].tolist() == ["0385"]
+
+
+def test_rank_window_pages_through_blank_values_last():
+    df = pd.DataFrame({"CompanyName": list("abcdef"), "ADR": [90.0, None, 70.0, None, 110.0, 80.0]})
+    for ascending in (False, True):
+        pages = [rank_window(df, "ADR", ascending, start, start + 2) for start in range(0, 6, 2)]
+        assert pd.concat(pages).equals(rank_companies(df, "ADR", ascending))
+
+
+def test_column_by_date_labels_ratio_columns_as_weighted_averages():
+    reports = {"2024-01 Rooms.csv": report("2024-01", NoOfNights=[2, 1], RoomRev=[200.0, 130.0], ADR=[100.0, 130.0])}
+    aggregates = aggregate_by_date(reports)
+    assert column_by_date(aggregates, "RoomRev").columns.tolist() == ["Date", "Summed Value", "Filename"]
+    assert column_by_date(aggregates, "ADR").columns.tolist() == ["Date", "Weighted Avg", "Filename"]
+    assert column_by_date(aggregates, "ADR")["Weighted Avg"].tolist() == [110.0]
+
+
+def nan_to_none(values):
+    return [None if isinstance(value, float) and math.isnan(value) else value for value in values]
+
+
+def test_ratio_parts_weight_each_row():
+    df = pd.DataFrame({"RoomRev": [200.0, 130.0], "NoOfNights": [2, 1], "AvgLeadTime": [10.0, 20.0], "Arrivals": [1, 3]})
+    numerator, weight = ratio_parts(df, "ADR")
+    assert numerator.tolist() == [200.0, 130.0] and weight.tolist() == [2, 1]
+    # No numerator column: the ratio itself times its weight
+    numerator, weight = ratio_parts(df, "AvgLeadTime")
+    assert numerator.tolist() == [10.0, 60.0] and weight.tolist() == [1, 3]
+
+
+def test_sum_by_weights_ratios_across_reports():
+    reports = {
+        "2024-01 Rooms.csv": report("2024-01", NoOfNights=[2, 1], RoomRev=[200.0, 130.0], ADR=[100.0, 130.0],
+                                    Arrivals=[1, 3], AvgLeadTime=[10.0, 20.0]),
+        "2024-02 Rooms.csv": report("2024-02", NoOfNights=[1], RoomRev=[160.0], ADR=[160.0], Arrivals=[4], AvgLeadTime=[5.0]),
+    }
+    aggregates = aggregate_by_date(reports)
+    assert aggregates["ADR"].tolist() == [110.0, 160.0]
+    assert aggregates["AvgLeadTime"].tolist() == [17.5, 5.0]
+    # Rolling the per-report rows up again gives sum(RoomRev) / sum(NoOfNights), not a mean of the ADRs
+    total = sum_by(aggregates.assign(Year=2024), ["Year"])
+    assert total["ADR"].tolist() == [490.0 / 4]
+    assert total["AvgLeadTime"].tolist() == [(70.0 + 20.0) / 8]
+    assert total["RoomRev"].tolist() == [490.0]
+
+
+def test_period_analytics_over_a_month_gap():
+    reports = {
+        "2023-01 Rooms.csv": report("2023-01", Rooms=[10]),
+        "2023-02 Rooms.csv": report("2023-02", Rooms=[20]),
+        "2024-02 Rooms.csv": report("2024-02", Rooms=[30]),
+        "2024-03 Rooms.csv": report("2024-03", Rooms=[60]),
+    }
+    table = period_analytics(aggregate_by_date(reports), "Rooms")
+    assert table["Month"].dt.strftime("%Y-%m").tolist() == ["2023-01", "2023-02", "2024-02", "2024-03"]
+    assert table["Value"].tolist() == [10, 20, 30, 60]
+    # Shifts are calendar months: January 2024 and March 2023 have no report
+    assert nan_to_none(table["MoM %"].tolist()) == [None, 100.0, None, 100.0]
+    assert nan_to_none(table["YoY %"].tolist()) == [None, None, 50.0, None]
+    assert table["Rolling 3M"].tolist() == [10, 30, 30, 90]
+    assert table["Rolling 12M"].tolist() == [10, 30, 30, 90]
+    assert table["YTD"].tolist() == [10, 30, 30, 90]
+
+
+def test_period_analytics_weights_ratio_windows():
+    reports = {
+        "2024-01 Rooms.csv": report("2024-01", NoOfNights=[2, 1], RoomRev=[200.0, 130.0], ADR=[100.0, 130.0]),
+        "2024-02 Rooms.csv": report("2024-02", NoOfNights=[1], RoomRev=[160.0], ADR=[160.0]),
+    }
+    table = period_analytics(aggregate_by_date(reports), "ADR")
+    assert table["Value"].tolist() == [110.0, 160.0]
+    assert table["YTD"].tolist() == [110.0, 490.0 / 4]
+    assert table["Rolling 3M"].tolist() == [110.0, 490.0 / 4]
+
+
+def test_date_rollups_per_granularity():
+    reports = {
+        "2024-01-30 Rooms.csv": report("2024-01-30", Rooms=[1], NoOfNights=[1], RoomRev=[100.0], ADR=[100.0]),
+        "2024-02-01 Rooms.csv": report("2024-02-01", Rooms=[2], NoOfNights=[1], RoomRev=[200.0], ADR=[200.0]),
+        "2024-02-02 Rooms.csv": report("2024-02-02", Rooms=[4], NoOfNights=[2], RoomRev=[300.0], ADR=[150.0]),
+        "2024-03 Rooms.csv": report("2024-03", Rooms=[8], NoOfNights=[1], RoomRev=[100.0], ADR=[100.0]),
+    }
+    aggregates = aggregate_by_date(reports)
+    assert available_granularities(aggregates["Date"]) == ["Daily", "Weekly", "Monthly", "Quarterly"]
+    assert available_granularities(["2024-01", "2024-02"]) == ["Monthly", "Quarterly"]
+
+    rollups = date_rollups(aggregates)
+    daily = rollup_view(rollups["Daily"], "Rooms")
+    assert daily["Period"].tolist() == ["2024-01-30", "2024-02-01", "2024-02-02", "2024-03-01"]
+    # Weeks start on Monday, across the month boundary
+    weekly = rollup_view(rollups["Weekly"], "Rooms")
+    assert weekly["Period"].tolist() == ["Week of 2024-01-29", "Week of 2024-02-26"]
+    assert weekly["Value"].tolist() == [7, 8] and weekly["Reports"].tolist() == [3, 1]
+    monthly = rollup_view(rollups["Monthly"], "Rooms")
+    assert monthly["Period"].tolist() == ["Jan 2024", "Feb 2024", "Mar 2024"]
+    assert monthly["Value"].tolist() == [1, 6, 8]
+    quarterly = rollup_view(rollups["Quarterly"], "ADR")
+    assert quarterly["Period"].tolist() == ["2024Q1"] and quarterly["Reports"].tolist() == [4]
+    assert quarterly["Value"].tolist() == [700.0 / 5]
+    assert rollup_view(rollups["Monthly"], "LostRev").empty
+
+
+def test_date_rollups_builds_only_the_requested_granularities():
+    reports = {"2024-01 Rooms.csv": report("2024-01", Rooms=[1]), "2024-04 Rooms.csv": report("2024-04", Rooms=[2])}
+    aggregates = aggregate_by_date(reports)
+    rollups = date_rollups(aggregates, available_granularities(aggregates["Date"]))
+    assert list(rollups) == ["Monthly", "Quarterly"]
+    assert rollup_view(rollups["Quarterly"], "Rooms")["Period"].tolist() == ["2024Q1", "2024Q2"]
+
+
+def test_run_batch_reports_undated_files_and_skips_empty_workbooks(tmp_path, capsys):
+    source = tmp_path / "reports"
+    source.mkdir()
+    (source / "2024-01 Company Revenue Report.csv").write_text("CompanyCode,CompanyName,Rooms\n0385,ABC Travel,3\n")
+    (source / "Company Revenue Report Demo.csv").write_text("CompanyCode,CompanyName,Rooms\n0385,ABC Travel,4\n")
+    (source / "2024-02 Company Revenue Report.csv").write_text("CompanyCode,CompanyName,RoomRev\n0385,ABC Travel,300\n")
+    output = tmp_path / "out"
+    result = run_batch(str(source), str(output), columns=["Rooms"], max_workers=1)
+    assert [os.path.basename(path) for path in result["workbooks"]] == [
+        "2024-01 Company Revenue Report.xlsx", "Company Revenue Report Demo.xlsx",
+    ]
+    assert result["undated"] == ["Company Revenue Report Demo.csv"]
+    assert result["no_columns"] == ["2024-02 Company Revenue Report.csv"]
+    assert not (output / "2024-02 Company Revenue Report.xlsx").exists()
+    assert os.path.exists(result["calculated_data"])
+
+    assert main([str(source), "-o", str(output), "-c", "Rooms", "-j", "1"]) == 0
+    err = capsys.readouterr().err
+    assert "Company Revenue Report Demo.csv" in err and "2024-02 Company Revenue Report.csv" in err
@@ -0,0 +1,15 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from vm_export import write_workbook
+
+
+def test_timestamps_are_written_with_a_date_format():
+    buffer = write_workbook({"Period Analytics": pd.DataFrame({"Month": pd.to_datetime(["2024-01-01"]), "Value": [1.0]})}, io.BytesIO())
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as workbook:
+        styles = workbook.read("xl/styles.xml").decode()
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+    assert 'formatCode="yyyy-mm-dd"' in styles
+    assert '<c r="A2" s="1"><v>45292</v>' in sheet  # 2024-01-01, styled with that format
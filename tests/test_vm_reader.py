@@ -0,0 +1,60 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+import vm_reader
+from vm_reader import extract_report_date, iter_report_members, read_vm_csv, report_member_names
+
+CSV = b"CompanyCode,CompanyName,Rooms\r\n0385,ABC Travel,3\r\n0166,XYZ Corp,4\r\n"
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("2024-01 Company Revenue Report.csv", "2024-01"),
+    ("Company Revenue Report 2024-02-29.csv", "2024-02-29"),
+    ("Report 2024-13.csv", None),
+    ("Report 2023-02-29.csv", None),
+    ("Company Revenue Report Demo.csv", None),
+])
+def test_extract_report_date(filename, expected):
+    assert extract_report_date(filename) == expected
+
+
+def bundle():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("2024/2024-01 Company Revenue Report.csv.gz", gzip.compress(CSV))
+        archive.writestr("__MACOSX/2024/2024-01 Company Revenue Report.csv.gz", b"resource fork")
+        archive.writestr("2024/", b"")
+        archive.writestr("2024-02 Company Revenue Report.csv", CSV)
+        archive.writestr("Company Revenue Report Notes.csv", CSV)
+        archive.writestr("readme.txt", b"not a report")
+    return buffer.getvalue()
+
+
+def test_report_member_names_lists_zip_reports_without_macos_metadata():
+    assert report_member_names("reports.zip", bundle()) == [
+        "2024-01 Company Revenue Report.csv", "2024-02 Company Revenue Report.csv", "Company Revenue Report Notes.csv",
+    ]
+    assert report_member_names("2024-03 Company Revenue Report.csv.gz", b"") == ["2024-03 Company Revenue Report.csv"]
+
+
+def test_iter_report_members_reads_nested_gzip_and_skips_rejected_members():
+    members = dict(iter_report_members("reports.zip", bundle(), accept=extract_report_date))
+    assert list(members) == ["2024-01 Company Revenue Report.csv", "2024-02 Company Revenue Report.csv"]
+    for read in members.values():
+        assert read() == CSV
+        assert read_vm_csv(read())["Rooms"].tolist() == [3, 4]
+
+
+def test_member_limit_applies_only_to_decompressed_members(monkeypatch):
+    monkeypatch.setattr(vm_reader, "MAX_MEMBER_BYTES", len(CSV) - 1)
+    [(_, read)] = iter_report_members("2024-01 Company Revenue Report.csv", CSV)
+    assert read() == CSV
+    [(_, read)] = iter_report_members("2024-01 Company Revenue Report.csv.gz", gzip.compress(CSV))
+    with pytest.raises(ValueError, match="uncompressed"):
+        read()
+    members = dict(iter_report_members("reports.zip", bundle()))
+    with pytest.raises(ValueError, match="uncompressed"):
+        members["2024-02 Company Revenue Report.csv"]()
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from vm_session import ParseCache, SessionFrames, frame_bytes, global_resident_bytes
+
+
+def test_parse_cache_evicts_least_recently_used_frames_past_its_byte_budget():
+    frames = {key: pd.DataFrame({"RoomRev": [float(i) for i in range(100)]}) for key in "abc"}
+    cache = ParseCache(max_bytes=2 * frame_bytes(frames["a"]))
+    calls = []
+
+    def get(key):
+        return cache.get_or_create(key, lambda: calls.append(key) or frames[key])
+
+    get("a"), get("b"), get("a"), get("c")  # "b" is the least recently used when "c" arrives
+    assert cache.total_bytes() <= cache.max_bytes
+    assert get("a") is frames["a"] and get("c") is frames["c"]
+    get("b")
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_parse_cache_keeps_a_frame_larger_than_its_budget():
+    cache = ParseCache(max_bytes=0)
+    df = pd.DataFrame({"RoomRev": [1.0]})
+    assert cache.get_or_create("a", lambda: df) is df
+    assert len(cache) == 1
+
+
+def test_spilling_a_parsed_frame_lowers_the_global_resident_total(tmp_path):
+    df = pd.DataFrame({"RoomRev": [float(i) for i in range(10_000)]})
+    cache = ParseCache()
+    frames = SessionFrames(max_bytes=10 * frame_bytes(df), spill_dir=str(tmp_path))
+    frames["uploaded_df_tab1"] = cache.get_or_create("digest", lambda: df)
+    assert frames["uploaded_df_tab1"] is not df  # The session owns its copy
+    before = global_resident_bytes()
+
+    frames.max_bytes = 0
+    frames["filtered_df"] = df[["RoomRev"]].head(1)  # Pushes the report out to disk
+    assert frames.spilled_keys() == ["uploaded_df_tab1"]
+    assert global_resident_bytes() < before
+    assert frames["uploaded_df_tab1"].equals(df)
+
+
+def test_global_limit_drops_parse_cache_frames_first_when_they_are_older(tmp_path):
+    df = pd.DataFrame({"RoomRev": [float(i) for i in range(10_000)]})
+    cache = ParseCache()
+    cache.get_or_create("old", lambda: df)
+    frames = SessionFrames(spill_dir=str(tmp_path), global_max_bytes=global_resident_bytes())
+    frames["report"] = df.copy()
+    assert len(cache) == 0 and frames.spilled_keys() == []
@@ -0,0 +1,34 @@
+import threading
+import time
+
+import vm_store
+
+
+def write_report(folder, name, rooms):
+    (folder / name).write_text("CompanyName,CompanyCode,Rooms\nABC Travel,00385140,%d\n" % rooms)
+
+
+def test_concurrent_ingests_into_one_store_keep_every_entry(tmp_path, monkeypatch):
+    store_dir = tmp_path / "store"
+    folders = [tmp_path / "a", tmp_path / "b"]
+    for index, folder in enumerate(folders):
+        folder.mkdir()
+        for month in range(1, 7):
+            write_report(folder, f"2024-{month:02d} {folder.name} Report.csv", index * 100 + month)
+
+    # Widen the load -> save window so an unlocked ingest would lose the other's entries
+    save_manifest = vm_store.save_manifest
+
+    def slow_save_manifest(*args):
+        time.sleep(0.05)
+        save_manifest(*args)
+
+    monkeypatch.setattr(vm_store, "save_manifest", slow_save_manifest)
+
+    threads = [threading.Thread(target=vm_store.ingest_directory, args=(str(folder), str(store_dir))) for folder in folders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(vm_store.load_manifest(str(store_dir))["files"]) == 12
@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+
+from vm_engine import divide_ratio, rank_companies, ratio_parts, report_timestamps
+from vm_reader import RATIO_COLUMNS, RATIO_DEFINITIONS
+
+# --------- COMPANY BAR CHART ---------
+# Reports with thousands of corporate accounts are reduced on the server before
+# anything is sent to the browser: either top / bottom N plus one "Other" bar, or, when
+# every company is charted, a WebGL trace over at most MAX_CHART_POINTS rank bins.
+# Ratio columns roll up into "Other" as weighted means, the same way the multi-file tab
+# aggregates them, when the frame carries their numerator / weight columns.
+#
+# plotly is imported inside the figure builders so importing this module (and starting
+# the app) doesn't pay for it until the first graph is drawn.
+DEFAULT_TOP_N = 20
+WEBGL_THRESHOLD = 500
+MAX_CHART_POINTS = 2000
+
+
+def _bucket_value(rows, column):
+    if column in RATIO_DEFINITIONS:
+        numerator, weight = ratio_parts(rows, column)
+        return divide_ratio(pd.Series([numerator.sum()]), pd.Series([weight.sum()])).iloc[0]
+    return rows[column].sum()
+
+
+def bucket_companies(df, column, top_n, bottom_n=0, ascending=False):
+    # top_n are the highest values and bottom_n the lowest whatever the sort order;
+    # everything between collapses into "Other". Uses partial selection, not a sort.
+    if len(df) <= top_n + bottom_n:
+        return rank_companies(df, column, ascending)
+    top = df.nlargest(top_n, column)
+    bottom = df.nsmallest(bottom_n, column).iloc[::-1]
+    middle = df.drop(top.index.union(bottom.index))
+    other = pd.DataFrame({
+        "CompanyName": [f"Other ({len(middle)} companies{', weighted avg' if column in RATIO_COLUMNS else ''})"],
+        column: [_bucket_value(middle, column)],
+    })
+    parts = [top[["CompanyName", column]], other]
+    if bottom_n:
+        parts.append(bottom[["CompanyName", column]])
+    chart_df = pd.concat(parts, ignore_index=True)
+    chart_df["CompanyName"] = chart_df["CompanyName"].astype(str)
+    return chart_df.iloc[::-1].reset_index(drop=True) if ascending else chart_df
+
+
+def downsample_ranked(ranked, column, max_points=MAX_CHART_POINTS):
+    # One point per rank, or the mean of consecutive rank bins for very long tails
+    values = ranked[column].to_numpy()
+    names = ranked["CompanyName"].astype(str).to_numpy()
+    ranks = np.arange(1, len(ranked) + 1)
+    if len(ranked) <= max_points:
+        return pd.DataFrame({"Rank": ranks, column: values, "CompanyName": names})
+    bins = np.arange(len(ranked)) * max_points // len(ranked)
+    grouped = pd.DataFrame({"bin": bins, "Rank": ranks, column: values}).groupby("bin")
+    first, last = grouped["Rank"].min(), grouped["Rank"].max()
+    return pd.DataFrame({
+        "Rank": first.to_numpy(),
+        column: grouped[column].mean().to_numpy(),
+        "CompanyName": [f"Ranks {a}–{b} (mean)" for a, b in zip(first, last)],
+    })
+
+
+def company_bar_chart(df, column, top_n=None, bottom_n=0, ascending=False):
+    # top_n=None charts every company, which is the only case that needs a full sort
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    title = f"{column} by CompanyName"
+    if top_n is None:
+        chart_df = rank_companies(df, column, ascending)
+    else:
+        chart_df = bucket_companies(df, column, top_n, bottom_n, ascending)
+
+    if len(chart_df) <= WEBGL_THRESHOLD:
+        fig = px.bar(
+            chart_df,
+            x="CompanyName",
+            y=column,
+            title=title,
+            labels={"CompanyName": "Company", column: column},
+            color=column,
+            color_continuous_scale="Blues"
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+        return fig
+
+    # Too many bars for SVG: rank on the x-axis, company names in the hover text
+    points = downsample_ranked(chart_df, column)
+    fig = go.Figure(go.Scattergl(
+        x=points["Rank"],
+        y=points[column],
+        mode="lines+markers",
+        marker=dict(color=points[column], colorscale="Blues", size=4),
+        line=dict(color="rgb(70, 130, 255)", width=1),
+        text=points["CompanyName"],
+        hovertemplate="%{text}<br>" + column + ": %{y}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"{title} ({len(chart_df)} companies)",
+        xaxis_title="Rank",
+        yaxis_title=column,
+    )
+    return fig
+
+
+# --------- TIME SERIES CHARTS ---------
+# Built from the Date / Period / Reports / Value frame produced by vm_engine.rollup_view.
+# Dates go on a real date axis: one trace however many reports are loaded, and plotly
+# picks the tick spacing, so a year of daily exports stays a small figure.
+
+
+def value_label(column):
+    return f"Weighted avg of {column}" if column in RATIO_COLUMNS else f"Sum of {column}"
+
+
+def date_bar_chart(view, column, granularity="Monthly"):
+    import plotly.express as px
+
+    fig_bar = px.bar(
+        view,
+        x="Date",
+        y="Value",
+        title=f"Comparison of {column} Over Time ({granularity})",
+        labels={"Value": value_label(column)},
+        hover_data={"Date": False, "Period": True, "Reports": True},
+    )
+    fig_bar.update_layout(
+        xaxis=dict(type="date", title="Date"),
+        yaxis_title=value_label(column),
+        xaxis_tickangle=-45,
+        showlegend=False,  # Hide the legend completely
+    )
+    return fig_bar
+
+
+def date_trend_chart(view, column, granularity="Monthly"):
+    import plotly.express as px
+
+    fig_line = px.line(
+        view,
+        x="Date",
+        y="Value",
+        markers=True,  # Connect the dots with lines and show markers
+        title=f"Trend of {column} Over Time ({granularity})",
+        labels={"Value": value_label(column)},
+        hover_data={"Date": False, "Period": True, "Reports": True},
+    )
+    fig_line.update_traces(line=dict(shape="linear", color="skyblue"))
+    fig_line.update_layout(
+        xaxis=dict(type="date", title="Date"),
+        yaxis_title=value_label(column),
+        xaxis_tickangle=-45,
+        showlegend=False,  # Hide the legend completely
+    )
+    return fig_line
+
+
+# --------- PERIOD ANALYTICS CHARTS ---------
+# Built from the per-month table produced by vm_engine.period_analytics.
+
+
+def month_comparison_chart(analytics, column):
+    import plotly.express as px
+
+    # One line per year across the calendar months present
+    chart_df = analytics.assign(
+        MonthName=analytics["Month"].dt.strftime("%B"),
+        Year=analytics["Year"].astype(str),
+    )
+    month_order = chart_df.sort_values(by="Month", key=lambda months: months.dt.month)["MonthName"].unique().tolist()
+    fig_line = px.line(
+        chart_df,
+        x="MonthName",
+        y="Value",
+        color="Year",  # Differentiate lines by year
+        markers=True,
+        title=f"Comparison of {column} by Month",
+        labels={"MonthName": "Month", "Value": value_label(column)},
+        category_orders={"MonthName": month_order},
+    )
+    fig_line.update_traces(marker=dict(size=8))
+    fig_line.update_layout(
+        yaxis_title=value_label(column),
+        xaxis_tickangle=-45,
+        showlegend=True,  # Show legend to differentiate years
+    )
+    return fig_line
+
+
+def period_change_chart(analytics, column):
+    import plotly.express as px
+
+    changes = analytics.melt(id_vars="Month", value_vars=["MoM %", "YoY %"], var_name="Change", value_name="Percent")
+    fig_bar = px.bar(
+        changes,
+        x="Month",
+        y="Percent",
+        color="Change",
+        barmode="group",
+        title=f"{column} Month-over-Month and Year-over-Year Change",
+        labels={"Percent": "Change (%)"},
+    )
+    fig_bar.update_layout(xaxis_tickformat="%b %Y", xaxis_tickangle=-45)
+    return fig_bar
+
+
+def rolling_trend_chart(analytics, column):
+    import plotly.express as px
+
+    windows = analytics.melt(
+        id_vars="Month", value_vars=["Value", "Rolling 3M", "Rolling 12M", "YTD"], var_name="Series", value_name="Amount"
+    )
+    fig_line = px.line(
+        windows,
+        x="Month",
+        y="Amount",
+        color="Series",
+        markers=True,
+        title=f"{column} Rolling Windows and Year-to-Date",
+        labels={"Amount": value_label(column)},
+    )
+    fig_line.update_layout(xaxis_tickformat="%b %Y", xaxis_tickangle=-45)
+    return fig_line
+
+
+# --------- ACCOUNT TREND CHARTS ---------
+# Built from vm_engine.company_trends / top_movers lookups on the company × period index.
+
+
+def account_trend_chart(trends, column):
+    import plotly.express as px
+
+    chart_df = trends.assign(
+        Account=trends["CompanyName"].fillna("") + " (" + trends["CompanyCode"].astype(str) + ")",
+        Date=report_timestamps(trends["Date"]),
+    )
+    fig_line = px.line(
+        chart_df.sort_values(by="Date"),
+        x="Date",
+        y="Value",
+        color="Account",  # One line per selected account
+        markers=True,
+        title=f"{column} by Account Over Time",
+        labels={"Value": column},
+    )
+    fig_line.update_layout(
+        xaxis=dict(type="date"),
+        xaxis_tickangle=-45,
+    )
+    return fig_line
+
+
+def top_movers_chart(gainers, decliners, column):
+    import plotly.express as px
+
+    movers = pd.concat([gainers, decliners.iloc[::-1]], ignore_index=True)
+    movers = movers.assign(
+        Account=movers["CompanyName"].fillna(movers["CompanyCode"]).astype(str),
+        Direction=np.where(movers["Change"] > 0, "Gain", "Decline"),
+    )
+    fig_bar = px.bar(
+        movers,
+        x="Change",
+        y="Account",
+        color="Direction",
+        color_discrete_map={"Gain": "#155724", "Decline": "#721c24"},  # Same greens / reds as the rank metrics
+        orientation="h",
+        title=f"Top Movers in {column}",
+        hover_data=["CompanyCode", "Start", "End", "Change %"],
+    )
+    fig_bar.update_layout(yaxis=dict(autorange="reversed"), showlegend=False)
+    return fig_bar
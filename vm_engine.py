@@ -0,0 +1,418 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from vm_export import write_workbook
+from vm_reader import ID_COLUMNS, RATIO_DEFINITIONS, extract_report_date, read_vm_csv
+
+# --------- REPORT AGGREGATION ---------
+# `reports` throughout is a {filename: {"df": DataFrame, "date": "YYYY-MM[-DD]"}}
+# mapping of loaded reports.
+
+
+def combine_reports(reports, id_columns=()):
+    # One long table of every numeric column (plus any id_columns), keyed by report Date
+    # and Filename. The key columns are repeated once over the concatenated frame, not
+    # assigned per report.
+    frames, dates, filenames = [], [], []
+    for filename, data in reports.items():
+        if data.get("df") is None or not data.get("date"):
+            continue
+        numeric = data["df"].select_dtypes("number")
+        present = [col for col in id_columns if col in data["df"].columns]
+        if present:
+            numeric = data["df"][present + list(numeric.columns)]
+        frames.append(numeric)
+        dates.append(data["date"])
+        filenames.append(filename)
+    if not frames:
+        return pd.DataFrame(columns=["Date", "Filename"])
+    lengths = [len(frame) for frame in frames]
+    long_df = pd.concat(frames, ignore_index=True)
+    long_df["Date"] = np.repeat(np.array(dates, dtype=object), lengths)
+    long_df["Filename"] = np.repeat(np.array(filenames, dtype=object), lengths)
+    return long_df
+
+
+def ratio_parts(df, column):
+    # (numerator, weight) series whose sums over any group give `column`'s weighted mean.
+    # Applies to company rows and to already aggregated rows alike, so reports can be
+    # rolled up again into months, rolling windows or year-to-date.
+    numerator, weight = RATIO_DEFINITIONS[column]
+    if numerator in df.columns and weight in df.columns:
+        return df[numerator], df[weight]
+    if weight in df.columns:
+        weights = df[weight].where(df[column].notna())
+    else:  # No weight column to go on: plain mean
+        weights = df[column].notna().astype(float).where(df[column].notna())
+    return df[column] * weights, weights
+
+
+def divide_ratio(numerator, weight):
+    return numerator / weight.where(weight != 0)
+
+
+def sum_by(long_df, keys):
+    # Sums of every value column per `keys` group in a single groupby (weighted means for
+    # the ratio columns). min_count=1 keeps columns a group doesn't have as NaN rather
+    # than a misleading 0.
+    value_columns = [col for col in long_df.columns if col not in list(keys) + ["Date", "Filename"] + ID_COLUMNS]
+    ratios = [col for col in value_columns if col in RATIO_DEFINITIONS]
+    # Ratios whose numerator and weight are both columns come straight from their sums;
+    # only the others (AvgLeadTime) need per-row products summed alongside
+    derived = [col for col in ratios if all(part in value_columns for part in RATIO_DEFINITIONS[col])]
+    parts = {}
+    for column in ratios:
+        if column not in derived:
+            parts[f"{column} numerator"], parts[f"{column} weight"] = ratio_parts(long_df, column)
+    if parts:
+        long_df = long_df.assign(**parts)
+    sums = long_df.groupby(list(keys), sort=True)[value_columns + list(parts)].sum(min_count=1)
+    if ratios:
+        # Every ratio in one array division rather than a Series op per column
+        numerators = [RATIO_DEFINITIONS[col][0] if col in derived else f"{col} numerator" for col in ratios]
+        weights = [RATIO_DEFINITIONS[col][1] if col in derived else f"{col} weight" for col in ratios]
+        numerators, weights = sums[numerators].to_numpy(dtype=float), sums[weights].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sums[ratios] = np.where(weights != 0, numerators / weights, np.nan)
+        sums = sums.drop(columns=list(parts))
+    return sums.reset_index()
+
+
+def aggregate_by_date(reports):
+    # One row of sums per report
+    return sum_by(combine_reports(reports), ["Date", "Filename"])
+
+
+def update_aggregates(aggregates, added=None, removed=(), aggregate=aggregate_by_date):
+    # Maintains an aggregate_by_date (or company_rows) table as reports come and go: only
+    # the added reports are summed, rows for removed (or replaced) filenames are dropped
+    added = added or {}
+    dropped = set(removed) | set(added)
+    parts = []
+    if aggregates is not None and len(aggregates):
+        parts.append(aggregates[~aggregates["Filename"].isin(dropped)])
+    if added:
+        parts.append(aggregate(added))
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return pd.DataFrame(columns=["Date", "Filename"])
+    combined = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    return combined.sort_values(by=["Date", "Filename"]).reset_index(drop=True)
+
+
+def value_header(column):
+    # Ratio columns hold a weighted mean per report, not a sum
+    return "Weighted Avg" if column in RATIO_DEFINITIONS else "Summed Value"
+
+
+def column_by_date(aggregates, column):
+    # Reshape the precomputed aggregates into the Date / Summed Value (or Weighted Avg) / Filename view
+    if column not in aggregates.columns:
+        return pd.DataFrame(columns=["Date", value_header(column), "Filename"])
+    view = aggregates[["Date", column, "Filename"]].dropna(subset=[column])
+    return view.rename(columns={column: value_header(column)}).reset_index(drop=True)
+
+
+# --------- CALENDAR ROLLUPS ---------
+# Report dates become real timestamps ("YYYY-MM" reports sit on the first of the month)
+# and the per-report sums are rolled up once per granularity when reports are loaded, so
+# switching granularity is a lookup rather than a regroup of the aggregates.
+ROLLUP_GRANULARITIES = {"Daily": "D", "Weekly": "W", "Monthly": "M", "Quarterly": "Q"}
+PERIOD_LABEL_FORMATS = {"Daily": "%Y-%m-%d", "Weekly": "Week of %Y-%m-%d", "Monthly": "%b %Y"}
+
+
+def report_timestamps(dates):
+    dates = pd.Series(dates).astype(str)
+    return pd.to_datetime(dates.where(dates.str.len() > 7, dates + "-01"), format="%Y-%m-%d")
+
+
+def available_granularities(dates):
+    # Daily and weekly views only mean something when some reports are daily
+    if any(len(str(date)) > 7 for date in dates):
+        return list(ROLLUP_GRANULARITIES)
+    return ["Monthly", "Quarterly"]
+
+
+def date_rollups(aggregates, granularities=ROLLUP_GRANULARITIES):
+    # {granularity: one row per period with its start (Date), a display label (Period),
+    # the number of Reports in it and every value column, ratios as weighted means}.
+    # granularities limits which are built (e.g. to available_granularities).
+    columns = ["Date", "Period", "Reports"]
+    if "Date" not in aggregates.columns or not len(aggregates):
+        return {granularity: pd.DataFrame(columns=columns) for granularity in granularities}
+    timestamps = report_timestamps(aggregates["Date"]).to_numpy()
+    rows = aggregates.drop(columns=["Date", "Filename"]).assign(Reports=1)
+    rollups = {}
+    for granularity in granularities:
+        starts = pd.PeriodIndex(timestamps, freq=ROLLUP_GRANULARITIES[granularity]).start_time
+        rolled = sum_by(rows.assign(Date=starts), ["Date"])
+        if granularity == "Quarterly":
+            labels = rolled["Date"].dt.to_period("Q").astype(str)
+        else:
+            labels = rolled["Date"].dt.strftime(PERIOD_LABEL_FORMATS[granularity])
+        rolled.insert(1, "Period", labels)
+        rollups[granularity] = rolled
+    return rollups
+
+
+def rollup_view(rollup, column):
+    # Date / Period / Reports / Value of one column at one granularity
+    if column not in rollup.columns:
+        return pd.DataFrame(columns=["Date", "Period", "Reports", "Value"])
+    view = rollup[["Date", "Period", "Reports", column]].dropna(subset=[column])
+    return view.rename(columns={column: "Value"}).reset_index(drop=True)
+
+
+# --------- PERIOD ANALYTICS ---------
+PERIOD_ANALYTICS_COLUMNS = ["Month", "Year", "Value", "MoM %", "YoY %", "Rolling 3M", "Rolling 12M", "YTD"]
+
+
+def period_analytics(aggregates, column):
+    # One row per month with reports: the month's value, month-over-month and
+    # year-over-year change, trailing 3 / 12 month windows and year-to-date. Everything is
+    # computed on a month-indexed frame (gaps included, so shifts are calendar months)
+    # without looping over periods. Summed columns roll up as totals, ratio columns as
+    # weighted means of their numerator / weight sums.
+    if column not in aggregates.columns or not len(aggregates):
+        return pd.DataFrame(columns=PERIOD_ANALYTICS_COLUMNS)
+    weighted = column in RATIO_DEFINITIONS
+    numerator, weight = ratio_parts(aggregates, column) if weighted else (aggregates[column], aggregates[column] * 0)
+    months = pd.PeriodIndex(aggregates["Date"].astype(str).str[:7], freq="M")
+    monthly = pd.DataFrame({"numerator": numerator.to_numpy(), "weight": weight.to_numpy()}, index=months)
+    monthly = monthly.groupby(level=0).sum(min_count=1)
+    monthly = monthly.reindex(pd.period_range(monthly.index.min(), monthly.index.max(), freq="M"))
+
+    def value(frame):
+        return divide_ratio(frame["numerator"], frame["weight"]) if weighted else frame["numerator"]
+
+    current = value(monthly)
+    table = pd.DataFrame({
+        "Month": monthly.index.to_timestamp(),
+        "Year": monthly.index.year,
+        "Value": current,
+        "MoM %": current.pct_change(1, fill_method=None) * 100,
+        "YoY %": current.pct_change(12, fill_method=None) * 100,
+        "Rolling 3M": value(monthly.rolling(3, min_periods=1).sum()),
+        "Rolling 12M": value(monthly.rolling(12, min_periods=1).sum()),
+        "YTD": value(monthly.groupby(monthly.index.year).cumsum()),
+    }).replace([np.inf, -np.inf], np.nan)  # Change from a zero month
+    return table[table["Value"].notna()].reset_index(drop=True)
+
+
+# --------- COMPANY × PERIOD INDEX ---------
+# Per-account values for every period, keyed by CompanyCode so a renamed account keeps
+# one history. The index is a frame on a sorted (CompanyCode, Date) MultiIndex with one
+# column per metric: it only holds the company / period pairs that occur (coordinate
+# form), since most accounts appear in just a few reports, and trend or mover queries
+# are index lookups rather than scans of the report frames.
+
+
+def company_rows(reports):
+    # Per-company sums of each report, with the company's name in that report. Reports
+    # without a CompanyCode column have no accounts to index and are skipped.
+    keys = ["CompanyCode", "Date", "Filename"]
+    reports = {
+        filename: data for filename, data in reports.items()
+        if data.get("df") is not None and "CompanyCode" in data["df"].columns
+    }
+    long_df = combine_reports(reports, id_columns=ID_COLUMNS)
+    if not len(long_df):
+        return pd.DataFrame(columns=keys + ["CompanyName"])
+    if "CompanyName" not in long_df.columns:
+        long_df["CompanyName"] = None
+    # Unnamed accounts go by their code
+    long_df["CompanyName"] = long_df["CompanyName"].astype(object).fillna(long_df["CompanyCode"]).astype(str)
+    if not long_df.duplicated(subset=keys).any():
+        return long_df  # Each account is listed once per report: nothing to sum
+    rows = sum_by(long_df, keys)
+    names = long_df[keys + ["CompanyName"]].drop_duplicates(subset=keys)
+    return rows.merge(names, on=keys, how="left")
+
+
+def company_period_index(rows):
+    if "CompanyCode" not in rows.columns or not len(rows):
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=["CompanyCode", "Date"]))
+    if rows["Date"].nunique() == rows["Filename"].nunique():
+        # One report per date: each row already is a company / period value
+        by_date = rows.drop(columns=["Filename", "CompanyName"]).set_index(["CompanyCode", "Date"])
+    else:
+        by_date = sum_by(rows, ["CompanyCode", "Date"]).set_index(["CompanyCode", "Date"])
+    return by_date.sort_index()
+
+
+def company_names(rows):
+    # CompanyCode -> the name used in its latest report
+    if "CompanyCode" not in rows.columns:
+        return pd.DataFrame(columns=["CompanyName"])
+    latest = rows.sort_values(by="Date").drop_duplicates(subset="CompanyCode", keep="last")
+    return latest.set_index("CompanyCode")[["CompanyName"]]
+
+
+def index_dates(index):
+    return sorted(index.index.get_level_values("Date").unique())
+
+
+def company_trends(index, metric, codes, names=None):
+    # Date / value history of each selected account
+    codes = [code for code in codes if code in index.index.levels[0]]
+    if not codes or metric not in index.columns:
+        return pd.DataFrame(columns=["CompanyCode", "Date", "Value", "CompanyName"])
+    trends = index.loc[codes, [metric]].dropna().reset_index().rename(columns={metric: "Value"})
+    if names is not None:
+        trends["CompanyName"] = trends["CompanyCode"].map(names["CompanyName"])
+    return trends
+
+
+def top_movers(index, metric, start, end, count=10, names=None):
+    # (gainers, decliners): the accounts whose metric rose / fell most from `start` to
+    # `end`. For summed columns an account missing from a period counts as 0 (won or lost
+    # business); ratio columns only compare accounts present in both periods.
+    values = index[metric].dropna()
+    dates = values.index.get_level_values("Date")
+    # A period where no report has the metric (an older export without LostRev) has no rows
+    before = values[dates == start].droplevel("Date").rename("Start")
+    after = values[dates == end].droplevel("Date").rename("End")
+    if metric in RATIO_DEFINITIONS:
+        movers = pd.concat([before, after], axis=1, join="inner")
+    else:
+        movers = pd.concat([before, after], axis=1).fillna(0)
+    movers["Change"] = movers["End"] - movers["Start"]
+    movers["Change %"] = movers["Change"] / movers["Start"].where(movers["Start"] != 0) * 100
+    if names is not None:
+        movers.insert(0, "CompanyName", names["CompanyName"].reindex(movers.index))
+    movers = movers.rename_axis("CompanyCode").reset_index()
+    gainers = movers[movers["Change"] > 0].nlargest(count, "Change")
+    decliners = movers[movers["Change"] < 0].nsmallest(count, "Change")
+    return gainers, decliners
+
+
+# --------- RANKING ---------
+def value_columns(df):
+    return [col for col in df.columns if col not in ID_COLUMNS]
+
+
+def rank_companies(df, column, ascending=False):
+    # The fully sorted per-company subset exported by the single-report tab
+    return df[["CompanyName", column]].sort_values(by=column, ascending=ascending)
+
+
+def top_and_bottom(df, column, ascending=False, count=3):
+    # (top, bottom) rows by partial selection, each in the order a full sort would list
+    # them, without paying for a sort of the whole report
+    top = df.nlargest(count, column)
+    bottom = df.nsmallest(count, column)
+    if ascending:
+        return top.iloc[::-1], bottom
+    return top, bottom.iloc[::-1]
+
+
+def rank_window(df, column, ascending=False, start=0, stop=25):
+    # Rows start..stop of the sorted order: selects the first `stop` rows only. Blank
+    # values go last, as in rank_companies, so every page of the full report is reachable.
+    subset = df[["CompanyName", column]]
+    ranked = subset.nsmallest(stop, column) if ascending else subset.nlargest(stop, column)
+    if len(ranked) < stop:
+        blanks = subset[subset[column].isna()]
+        ranked = pd.concat([ranked, blanks.iloc[:stop - len(ranked)]])
+    return ranked.iloc[start:stop]
+
+
+
+# --------- HEADLESS BATCH PROCESSING ---------
+# Runs the same ranking, per-date sums and Excel export as the app over a directory of
+# Visual Matrix CSVs, one worker process per file:
+#
+#   python vm_engine.py <csv folder> -o <output folder> [-c RoomRev -c ADR] [--ascending]
+
+
+def process_report(path, output_dir, columns=None, ascending=False):
+    # Worker: parse one report, export its ranked subsets and return its per-date sums.
+    # No workbook (None) for a report without any of the requested columns.
+    filename = os.path.basename(path)
+    df = read_vm_csv(path)
+    columns = [col for col in (columns or value_columns(df)) if col in df.columns]
+    workbook_path = None
+    if columns:
+        sheets = {column: rank_companies(df, column, ascending) for column in columns}
+        workbook_path = os.path.join(output_dir, f"{os.path.splitext(filename)[0]}.xlsx")
+        write_workbook(sheets, workbook_path)
+
+    extracted_date = extract_report_date(filename)
+    sums = aggregate_by_date({filename: {"df": df, "date": extracted_date}}) if extracted_date else None
+    return workbook_path, sums
+
+
+def run_batch(source_dir, output_dir, columns=None, ascending=False, max_workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = sorted(
+        entry.path for entry in os.scandir(source_dir)
+        if entry.is_file() and entry.name.lower().endswith(".csv")
+    )
+    # undated: left out of calculated_data.xlsx; no_columns: none of the columns, no workbook
+    result = {"workbooks": [], "errors": {}, "undated": [], "no_columns": [], "calculated_data": None}
+    per_report_sums = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(process_report, path, output_dir, columns, ascending): path for path in paths}
+        for future in as_completed(futures):
+            filename = os.path.basename(futures[future])
+            try:
+                workbook_path, sums = future.result()
+            except Exception as e:
+                result["errors"][filename] = str(e)
+                continue
+            if workbook_path is None:
+                result["no_columns"].append(filename)
+            else:
+                result["workbooks"].append(workbook_path)
+            if sums is not None:
+                per_report_sums.append(sums)
+            else:
+                result["undated"].append(filename)
+
+    if per_report_sums:
+        aggregates = pd.concat(per_report_sums, ignore_index=True).sort_values(by=["Date", "Filename"])
+        sum_columns = columns or [col for col in aggregates.columns if col not in ["Date", "Filename"]]
+        # A summary sheet of every summed column, then one Date / Summed Value (Weighted Avg for ratios) sheet per column
+        sheets = {"Summary": aggregates}
+        sheets.update({column: column_by_date(aggregates, column) for column in sum_columns if column in aggregates.columns})
+        calculated_path = os.path.join(output_dir, "calculated_data.xlsx")
+        write_workbook(sheets, calculated_path)
+        result["calculated_data"] = calculated_path
+    for key in ["workbooks", "undated", "no_columns"]:
+        result[key].sort()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank, sum and export a folder of Visual Matrix CSV reports.")
+    parser.add_argument("source_dir", help="Folder containing Visual Matrix CSV exports")
+    parser.add_argument("-o", "--output-dir", default="vm_output", help="Folder to write .xlsx workbooks to")
+    parser.add_argument("-c", "--column", action="append", dest="columns",
+                        help="Data column to analyze (repeatable; defaults to every data column)")
+    parser.add_argument("--ascending", action="store_true", help="Sort companies ascending instead of descending")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source_dir):
+        parser.error(f"folder not found: {args.source_dir}")
+
+    result = run_batch(args.source_dir, args.output_dir, args.columns, args.ascending, args.workers)
+    print(f"{len(result['workbooks'])} report workbooks written to {args.output_dir}")
+    if result["calculated_data"]:
+        print(f"Per-date sums written to {result['calculated_data']}")
+    for filename in result["undated"]:
+        print(f"Could not extract date from filename: {filename}. It is not in the per-date sums.", file=sys.stderr)
+    for filename in result["no_columns"]:
+        print(f"None of the requested columns in '{filename}'; no workbook written.", file=sys.stderr)
+    for filename, error in sorted(result["errors"].items()):
+        print(f"Error reading CSV file '{filename}': {error}", file=sys.stderr)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# --------- STREAMING EXCEL EXPORT ---------
+# Workbooks are written with xlsxwriter's constant_memory mode: each row is flushed to
+# disk as soon as the next one starts, so memory stays flat no matter how many rows or
+# sheets are exported. Frames are converted to Python values one chunk at a time.
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_DATE_FORMAT = "yyyy-mm-dd"
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get("VM_EXPORT_CACHE_MB", "256")) * 1024 * 1024
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _iter_rows(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)  # NaN / <NA> -> blank cell
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_sheet(workbook, sheet_name, df, chunk_rows=EXPORT_CHUNK_ROWS):
+    worksheet = workbook.add_worksheet(sheet_name[:31])  # Excel's sheet name limit
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    for row_number, row in enumerate(_iter_rows(df, chunk_rows), start=1):
+        worksheet.write_row(row_number, 0, row)
+    return worksheet
+
+
+def write_workbook(sheets, target, chunk_rows=EXPORT_CHUNK_ROWS):
+    # sheets: {sheet name: DataFrame}, written in order; target: path or binary buffer.
+    # Buffers lose the constant-memory benefit, so prefer a path for large exports.
+    import xlsxwriter  # Deferred until the first export
+
+    workbook = xlsxwriter.Workbook(target, {
+        "constant_memory": True,
+        "in_memory": not isinstance(target, str),
+        "default_date_format": EXPORT_DATE_FORMAT,  # Timestamps (months, rollup periods) as dates, not serials
+    })
+    try:
+        for sheet_name, df in sheets.items():
+            write_sheet(workbook, sheet_name, df, chunk_rows)
+    finally:
+        workbook.close()
+    return target
+
+
+def spool_workbook(sheets, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Writes to a temp file and returns its path; the caller owns (and removes) the file
+    fd, path = tempfile.mkstemp(prefix="vm_export_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_workbook(sheets, path, chunk_rows)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def remove_spooled(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# --------- EXPORT CACHE ---------
+class ExportCache:
+    # Spooled workbooks keyed by (view, input file hashes, view parameters) and shared by
+    # every session. Once the files on disk exceed max_bytes the least recently used
+    # workbooks are deleted; the newest one is always kept.
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (path, size in bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def get_or_create(self, key, build_sheets, chunk_rows=EXPORT_CHUNK_ROWS):
+        # build_sheets is only called on a miss
+        path = self.get(key)
+        if path is not None:
+            return path
+        path = spool_workbook(build_sheets(), chunk_rows)
+        with self._lock:
+            if key in self._entries:  # Another session built it meanwhile
+                remove_spooled(path)
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            self._entries[key] = (path, os.path.getsize(path))
+            self._evict()
+        return path
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def _evict(self):
+        total = sum(size for _, size in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, (path, size) = self._entries.popitem(last=False)
+            remove_spooled(path)
+            total -= size
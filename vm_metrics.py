@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --------- PIPELINE STAGE METRICS ---------
+# Each instrumented stage records wall time, rows processed and the change in resident
+# memory, then appends the record as one JSON line to METRICS_LOG_PATH:
+#
+#   with timed_stage("csv_read", records=session_records) as record:
+#       df = read_vm_csv(data)
+#       record["rows"] = len(df)
+#
+# Set VM_METRICS_LOG to an empty string to turn the log file off.
+METRICS_LOG_PATH = os.environ.get("VM_METRICS_LOG", "vm_metrics.jsonl")
+
+_log_lock = threading.Lock()
+
+
+def current_rss_bytes():
+    # Resident set size of this process, or None where it can't be read cheaply
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak rather than current RSS, but still shows which stages grow the process.
+        # macOS reports ru_maxrss in bytes, Linux and the BSDs in kilobytes.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return None
+
+
+def append_log(record, log_path=METRICS_LOG_PATH):
+    if not log_path:
+        return
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def timed_stage(stage, rows=None, records=None, log_path=METRICS_LOG_PATH, **fields):
+    # records: optional list / deque the finished record is appended to.
+    # Extra keyword fields (e.g. column, view) are stored on the record as-is.
+    record = {"stage": stage, "rows": rows, **fields}
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        rss_after = current_rss_bytes()
+        record["memory_delta_bytes"] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        record["timestamp"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        if records is not None:
+            records.append(record)
+        append_log(record, log_path)
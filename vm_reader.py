@@ -0,0 +1,264 @@
+import csv
+import gzip
+import hashlib
+import io
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit, but stay usable without it
+    pa = None
+    pa_csv = None
+
+# --------- VISUAL MATRIX REPORT SCHEMA ---------
+# Compact dtypes for the known "Company Revenue Report" columns. CompanyCode stays a
+# string so leading zeros (e.g. 00385140) survive; CompanyName repeats heavily across
+# reports so it is stored as a categorical. Columns not listed here are inferred.
+VM_SCHEMA = {
+    "CompanyName": "category",
+    "CompanyCode": "string",
+    "Arrivals": "int32",
+    "NoOfNights": "int32",
+    "Adults": "int32",
+    "Children": "int32",
+    "RoomRev": "float64",
+    "FBRev": "float64",
+    "OtherRev": "float64",
+    "TotalRev": "float64",
+    "AvgLeadTime": "float64",
+    "AvgStayLength": "float64",
+    "ADR": "float64",
+    "ATR": "float64",
+    "LostNights": "int32",
+    "LostRev": "float64",
+}
+
+ID_COLUMNS = ["CompanyName", "CompanyCode"]
+
+# Per-company averages: these can't be summed across companies or reports
+RATIO_COLUMNS = ["AvgLeadTime", "AvgStayLength", "ADR", "ATR"]
+
+# How each ratio rolls up across companies, reports and periods: (numerator, weight)
+# sums, e.g. ADR = sum(RoomRev) / sum(NoOfNights). AvgLeadTime has no numerator
+# column, so it is averaged weighted by Arrivals.
+RATIO_DEFINITIONS = {
+    "AvgLeadTime": (None, "Arrivals"),
+    "AvgStayLength": ("NoOfNights", "Arrivals"),
+    "ADR": ("RoomRev", "NoOfNights"),
+    "ATR": ("TotalRev", "NoOfNights"),
+}
+
+
+def ratio_inputs(column):
+    # Columns needed to aggregate `column` correctly (just itself for summed columns)
+    numerator, weight = RATIO_DEFINITIONS.get(column, (None, None))
+    return [column] + [col for col in (numerator, weight) if col]
+
+if pa is not None:
+    _ARROW_TYPES = {
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "string": pa.string(),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+    }
+
+
+def file_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def extract_report_date(filename):
+    # Reports are dated by filename: "YYYY-MM-DD" takes precedence over "YYYY-MM".
+    # Impossible dates ("2024-13", "2024-02-30") count as no date at all.
+    date_match_ymd = re.search(r"(\d{4}-\d{2}-\d{2})", filename)
+    if date_match_ymd:
+        return _valid_date(date_match_ymd.group(1), "%Y-%m-%d")
+    date_match_ym = re.search(r"(\d{4}-\d{2})", filename)
+    if date_match_ym:
+        return _valid_date(date_match_ym.group(1), "%Y-%m")
+    return None
+
+
+def _valid_date(text, date_format):
+    try:
+        datetime.strptime(text, date_format)
+    except ValueError:
+        return None
+    return text
+
+
+def _as_buffer(source):
+    # Accepts raw bytes, a file-like object or a local path
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        return open(source, "rb")
+    source.seek(0)
+    return source
+
+
+def read_header(source):
+    buffer = _as_buffer(source)
+    try:
+        first_line = buffer.readline().decode("utf-8-sig")
+    finally:
+        if isinstance(source, str):
+            buffer.close()
+    return next(csv.reader([first_line]), [])
+
+
+def read_vm_csv(source, columns=None):
+    # When `columns` is given only those columns are parsed (usecols pushdown)
+    header = read_header(source)
+    if columns is not None:
+        wanted = [col for col in header if col in set(columns)]
+    else:
+        wanted = header
+    dtypes = {col: VM_SCHEMA[col] for col in wanted if col in VM_SCHEMA}
+
+    buffer = _as_buffer(source)
+    try:
+        if pa_csv is not None:
+            table = pa_csv.read_csv(
+                buffer,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: _ARROW_TYPES[dtype] for col, dtype in dtypes.items()},
+                    include_columns=wanted,
+                ),
+            )
+            df = table.to_pandas()
+            if "CompanyCode" in df.columns:
+                df["CompanyCode"] = df["CompanyCode"].astype("string")
+        else:
+            df = pd.read_csv(buffer, usecols=wanted, dtype=dtypes)
+    except ValueError:
+        # Malformed values (blank counts, stray text) -> fall back to plain inference.
+        # pyarrow's ArrowInvalid is a ValueError subclass, so both engines land here.
+        buffer.seek(0)
+        fallback_dtypes = {"CompanyCode": "string"} if "CompanyCode" in wanted else None
+        df = pd.read_csv(buffer, usecols=wanted, dtype=fallback_dtypes)
+    finally:
+        if isinstance(source, str):
+            buffer.close()
+    return df.reset_index(drop=True)
+
+
+# --------- COMPRESSED BUNDLES ---------
+# Uploads may be plain CSVs, gzipped CSVs (.csv.gz) or zip bundles of either. Members are
+# handed out as (member name, read) pairs and only decompressed when read() is called,
+# one member at a time, so a bundle never sits in memory uncompressed. A decompressed
+# member (a .csv.gz or anything inside a zip) larger than VM_MAX_MEMBER_MB is refused
+# rather than inflated; plain CSV uploads are already their full size and read as-is.
+REPORT_UPLOAD_TYPES = ["csv", "gz", "zip"]
+MAX_MEMBER_BYTES = int(os.environ.get("VM_MAX_MEMBER_MB", "512")) * 1024 * 1024
+
+
+def is_report_member(name):
+    base = posixpath.basename(name)
+    return not base.startswith(".") and base.lower().endswith((".csv", ".csv.gz"))
+
+
+def _member_name(name):
+    # "2024/2024-01 Company Revenue Report.csv.gz" -> "2024-01 Company Revenue Report.csv"
+    base = posixpath.basename(name.replace("\\", "/"))
+    return base[:-3] if base.lower().endswith(".gz") else base
+
+
+def _read_limited(stream, name):
+    data = stream.read(MAX_MEMBER_BYTES + 1)
+    if len(data) > MAX_MEMBER_BYTES:
+        raise ValueError(f"'{name}' is larger than {MAX_MEMBER_BYTES // 1_048_576} MB uncompressed")
+    return data
+
+
+def _member_reader(open_member, name, compressed=True):
+    def read():
+        with open_member() as stream:
+            if name.lower().endswith(".gz"):
+                with gzip.GzipFile(fileobj=stream) as inflated:
+                    return _read_limited(inflated, name)
+            return _read_limited(stream, name) if compressed else stream.read()
+    return read
+
+
+def _zip_members(source):
+    # Left open on purpose: workers read members after iteration has finished, and the
+    # ZipFile only wraps the caller's buffer
+    archive = zipfile.ZipFile(_as_buffer(source))
+    return archive, [info for info in archive.infolist() if not info.is_dir() and is_report_member(info.filename)
+                     and not info.filename.startswith("__MACOSX/")]
+
+
+def report_member_names(name, source):
+    # Report filenames in an upload, read from the zip directory without decompressing
+    if name.lower().endswith(".zip"):
+        return [_member_name(info.filename) for info in _zip_members(source)[1]]
+    return [_member_name(name)]
+
+
+def iter_report_members(name, source, accept=None):
+    # Yields (report filename, read) for each CSV in an upload. accept(filename) can
+    # reject members (e.g. undated ones) before anything is decompressed.
+    lower = name.lower()
+    if lower.endswith(".zip"):
+        archive, members = _zip_members(source)
+        for info in members:
+            filename = _member_name(info.filename)
+            if accept is None or accept(filename):
+                yield filename, _member_reader(lambda info=info: archive.open(info), info.filename)
+    else:
+        filename = _member_name(name)
+        if accept is None or accept(filename):
+            yield filename, _member_reader(lambda: _as_buffer(source), name, compressed=False)
+
+
+# --------- PARALLEL INGEST ---------
+# pyarrow's CSV reader releases the GIL, so a thread pool parses several reports at once
+# without pickling frames between processes. VM_INGEST_WORKERS bounds the concurrency.
+INGEST_MAX_WORKERS = int(os.environ.get("VM_INGEST_WORKERS", min(8, os.cpu_count() or 1)))
+
+
+def ingest_parallel(sources, load=read_vm_csv, max_workers=None, on_progress=None, initializer=None, total=None):
+    # sources: {name: source} or an iterable of (name, source) pairs. Iterables are
+    # consumed lazily with at most 2 x workers sources in flight, so a generator of
+    # archive members never has every member decompressed at once. Returns
+    # ({name: load(source)}, {name: exception}) with results in input order.
+    # on_progress(done, total, name) runs on the calling thread; total may be None.
+    if isinstance(sources, dict):
+        total = len(sources)
+        if not sources:
+            return {}, {}
+        sources = sources.items()
+    workers = max(1, min(max_workers or INGEST_MAX_WORKERS, total or INGEST_MAX_WORKERS))
+    results, errors, order, pending = {}, {}, [], {}
+    done = 0
+
+    def collect(finished):
+        nonlocal done
+        for future in finished:
+            name = pending.pop(future)
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total, name)
+
+    with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        for name, source in sources:
+            order.append(name)
+            pending[pool.submit(load, source)] = name
+            if len(pending) >= 2 * workers:
+                collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+        while pending:
+            collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+    return {name: results[name] for name in order if name in results}, errors
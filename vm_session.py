@@ -0,0 +1,232 @@
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import pandas as pd
+
+# --------- SESSION FRAME STORE ---------
+# Each browser session keeps its DataFrames in a SessionFrames mapping instead of
+# directly in st.session_state. Frames stay in RAM while the session is under
+# SESSION_MEMORY_BYTES and every session together is under GLOBAL_MEMORY_BYTES; past
+# either cap the least recently used frames are spilled to Parquet files in a per-session
+# temp folder and read back transparently the next time they are accessed. The shared
+# parse cache counts toward the global cap too: under global pressure its least
+# recently used frames are dropped (they can be re-parsed) in the same LRU order.
+SESSION_MEMORY_BYTES = int(os.environ.get("VM_SESSION_MEMORY_MB", "512")) * 1024 * 1024
+GLOBAL_MEMORY_BYTES = int(os.environ.get("VM_GLOBAL_MEMORY_MB", "2048")) * 1024 * 1024
+SPILL_DIR = os.environ.get("VM_SPILL_DIR") or tempfile.gettempdir()
+
+_global_lock = threading.RLock()
+_all_stores = weakref.WeakSet()
+_parse_caches = weakref.WeakSet()
+_ticks = itertools.count()  # Shared access clock, so LRU order holds across sessions
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def global_resident_bytes():
+    with _global_lock:
+        return sum(store.resident_bytes() for store in _all_stores) + sum(cache.total_bytes() for cache in _parse_caches)
+
+
+def _enforce_global_limit(max_bytes, keep=None):
+    # Spills (session frames) or drops (parse cache) the least recently used frame of the
+    # whole process until everything resident fits in max_bytes
+    with _global_lock:
+        while global_resident_bytes() > max_bytes:
+            candidates = [(store, store._lru_resident(keep)) for store in list(_all_stores)]
+            candidates = [(store, entry.tick) for store, entry in candidates if entry is not None]
+            candidates += [(cache, cache._lru_tick()) for cache in list(_parse_caches)]
+            candidates = [(owner, tick) for owner, tick in candidates if tick is not None]
+            if not candidates:
+                break
+            owner, _ = min(candidates, key=lambda item: item[1])
+            if isinstance(owner, ParseCache):
+                owner._drop_lru()
+            else:
+                owner._spill(owner._lru_resident(keep))
+
+
+class _Entry:
+    __slots__ = ("df", "size", "tick", "spill_path")
+
+    def __init__(self, df):
+        self.df = df
+        self.size = frame_bytes(df)
+        self.tick = next(_ticks)
+        self.spill_path = None
+
+
+class SessionFrames(MutableMapping):
+    # Compared by identity (not contents) so every store can sit in _all_stores
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __init__(self, max_bytes=SESSION_MEMORY_BYTES, global_max_bytes=GLOBAL_MEMORY_BYTES, spill_dir=SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.global_max_bytes = global_max_bytes
+        self._spill_dir = tempfile.mkdtemp(prefix="vm_spill_", dir=spill_dir)
+        self._entries = {}
+        self._names = itertools.count()
+        # Spill files go when the session's store is garbage collected
+        weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        with _global_lock:
+            _all_stores.add(self)
+
+    # --- mapping interface ---
+    def __getitem__(self, key):
+        with _global_lock:
+            entry = self._entries[key]
+            entry.tick = next(_ticks)
+            if entry.df is None:
+                entry.df = self._load(entry.spill_path)
+                self._enforce_limits(keep=entry)
+            return entry.df
+
+    def __setitem__(self, key, df):
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError(f"SessionFrames only holds DataFrames, got {type(df).__name__}")
+        if any(cache.holds(df) for cache in list(_parse_caches)):
+            # A shared parsed frame: spilling it would free nothing while the cache holds it
+            df = df.copy()
+        with _global_lock:
+            self._discard(key)
+            entry = self._entries[key] = _Entry(df)
+            self._enforce_limits(keep=entry)
+
+    def __delitem__(self, key):
+        with _global_lock:
+            if key not in self._entries:
+                raise KeyError(key)
+            self._discard(key)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # --- accounting ---
+    def resident_bytes(self):
+        return sum(entry.size for entry in self._entries.values() if entry.df is not None)
+
+    def spilled_bytes(self):
+        return sum(entry.size for entry in self._entries.values() if entry.df is None)
+
+    def spilled_keys(self):
+        return [key for key, entry in self._entries.items() if entry.df is None]
+
+    # --- spilling ---
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.spill_path and os.path.exists(entry.spill_path):
+            os.remove(entry.spill_path)
+
+    def _lru_resident(self, keep=None):
+        resident = [entry for entry in self._entries.values() if entry.df is not None and entry is not keep]
+        return min(resident, key=lambda entry: entry.tick, default=None)
+
+    def _spill(self, entry):
+        if entry.spill_path is None:  # Frames are never mutated in place, so one write is enough
+            path = os.path.join(self._spill_dir, f"{next(self._names)}.parquet")
+            try:
+                entry.df.to_parquet(path)
+            except Exception:
+                # Mixed-type object columns Parquet can't encode
+                path = path[:-len(".parquet")] + ".pkl"
+                entry.df.to_pickle(path)
+            entry.spill_path = path
+        entry.df = None
+
+    @staticmethod
+    def _load(path):
+        if path.endswith(".pkl"):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        return pd.read_parquet(path)
+
+    def _enforce_limits(self, keep=None):
+        # The frame just stored or read (keep) is never the one spilled
+        while self.resident_bytes() > self.max_bytes:
+            victim = self._lru_resident(keep)
+            if victim is None:
+                break
+            self._spill(victim)
+        _enforce_global_limit(self.global_max_bytes, keep)
+
+
+# --------- SHARED PARSE CACHE ---------
+# Parsed report frames keyed by a hash of the raw file bytes and shared by every
+# session. Bounded by the frames' in-memory size rather than an entry count: once the
+# cache holds more than PARSE_CACHE_MAX_BYTES the least recently used frames are
+# dropped; the newest one is always kept. Frames handed out are shared, so SessionFrames
+# keeps its own copy of any cached frame it is given.
+PARSE_CACHE_MAX_BYTES = int(os.environ.get("VM_PARSE_CACHE_MB", "1024")) * 1024 * 1024
+
+
+class ParseCache:
+    def __init__(self, max_bytes=PARSE_CACHE_MAX_BYTES, global_max_bytes=GLOBAL_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.global_max_bytes = global_max_bytes
+        self._entries = OrderedDict()  # digest -> (df, size in bytes, access tick)
+        self._lock = threading.Lock()
+        with _global_lock:
+            _parse_caches.add(self)
+
+    def get_or_create(self, key, parse):
+        # parse is only called on a miss, outside the lock so workers parse in parallel
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], next(_ticks))
+                self._entries.move_to_end(key)
+                return entry[0]
+        df = parse()
+        with self._lock:
+            if key in self._entries:  # Another session parsed it meanwhile
+                entry = self._entries[key]
+                self._entries[key] = (entry[0], entry[1], next(_ticks))
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (df, frame_bytes(df), next(_ticks))
+            self._evict()
+        _enforce_global_limit(self.global_max_bytes)  # Never while holding self._lock
+        return df
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry[1] for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def holds(self, df):
+        with self._lock:
+            return any(entry[0] is df for entry in self._entries.values())
+
+    def _evict(self):
+        total = sum(entry[1] for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            total -= size
+
+    # --- global limit ---
+    def _lru_tick(self):
+        with self._lock:
+            return next(iter(self._entries.values()))[2] if self._entries else None
+
+    def _drop_lru(self):
+        with self._lock:
+            if self._entries:
+                self._entries.popitem(last=False)
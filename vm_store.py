@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from vm_reader import extract_report_date, file_digest, ratio_inputs, read_vm_csv
+
+# --------- LOCAL COLUMNAR REPORT STORE ---------
+# Visual Matrix CSVs are ingested once into Parquet files partitioned by report date:
+#
+#   <store>/manifest.json
+#   <store>/date=2024-01/2024-01 Company Revenue Report-<digest>.parquet
+#
+# The manifest remembers each source file's mtime, size and content hash, so later
+# ingests of the same folder only parse new or changed files. Reads pull a single
+# column out of each Parquet file instead of re-parsing whole CSVs.
+DEFAULT_STORE_DIR = os.environ.get("VM_STORE_DIR", ".vm_store")
+MANIFEST_NAME = "manifest.json"
+
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+
+def store_lock(store_dir=DEFAULT_STORE_DIR):
+    # One lock per store folder for this process: the ingest buttons and every watched
+    # folder load, update and save the same manifest, and the last writer would otherwise
+    # drop the others' entries (orphaning their Parquet files)
+    with _store_locks_guard:
+        return _store_locks.setdefault(os.path.abspath(store_dir), threading.RLock())
+
+
+def load_manifest(store_dir=DEFAULT_STORE_DIR):
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {"files": {}}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, store_dir=DEFAULT_STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)  # never leave a half-written manifest behind
+
+
+def ingest_file(path, manifest, store_dir=DEFAULT_STORE_DIR, filename=None):
+    # Returns "ingested", "unchanged" or "skipped"; parse errors propagate to the caller
+    filename = filename or os.path.basename(path)
+    stat = os.stat(path)
+    record = manifest["files"].get(filename)
+    if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+        return "unchanged"
+
+    extracted_date = extract_report_date(filename)
+    if extracted_date is None:
+        return "skipped"
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = file_digest(data)
+    if record and record["digest"] == digest:
+        # Touched but identical content: refresh the stat fingerprint only
+        record.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        return "unchanged"
+
+    df = read_vm_csv(data)
+    stem = os.path.splitext(filename)[0]
+    rel_path = os.path.join(f"date={extracted_date}", f"{stem}-{digest[:12]}.parquet")
+    os.makedirs(os.path.join(store_dir, f"date={extracted_date}"), exist_ok=True)
+    df.to_parquet(os.path.join(store_dir, rel_path), index=False)
+
+    if record and record["path"] != rel_path:
+        old_path = os.path.join(store_dir, record["path"])
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+    manifest["files"][filename] = {
+        "date": extracted_date,
+        "digest": digest,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "path": rel_path,
+        "rows": len(df),
+        "columns": list(df.columns),
+    }
+    return "ingested"
+
+
+def ingest_directory(source_dir, store_dir=DEFAULT_STORE_DIR):
+    result = {"ingested": [], "unchanged": [], "skipped": [], "errors": {}}
+    with store_lock(store_dir):
+        manifest = load_manifest(store_dir)
+        for entry in sorted(os.scandir(source_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(".csv"):
+                continue
+            try:
+                status = ingest_file(entry.path, manifest, store_dir)
+                result[status].append(entry.name)
+            except Exception as e:
+                result["errors"][entry.name] = str(e)
+        save_manifest(manifest, store_dir)
+    return result
+
+
+# --------- WATCHED FOLDER ---------
+# A folder the PMS drops exports into can be watched: polling only stats the folder, and
+# the folder is handed to ingest_directory (which skips files whose mtime / size or
+# content hash are unchanged) only when a CSV was added, touched or resized. Files
+# removed from the folder stay in the store, like any other ingested history.
+WATCH_INTERVAL_SECONDS = float(os.environ.get("VM_WATCH_INTERVAL", "30"))
+
+
+def directory_signature(source_dir):
+    # (name, mtime_ns, size) of every CSV in the folder: one stat per file, no reads
+    signature = []
+    for entry in os.scandir(source_dir):
+        if entry.is_file() and entry.name.lower().endswith(".csv"):
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+
+class DirectoryWatcher:
+    # One per watched folder, shared by every session that polls it. Polls closer together
+    # than min_interval return straight away, so many open sessions cost one scan. The
+    # default is half the refresh interval, so each session tick sees a fresh scan.
+    # `version` goes up whenever a poll ingested something.
+    def __init__(self, source_dir, store_dir=DEFAULT_STORE_DIR, min_interval=WATCH_INTERVAL_SECONDS / 2):
+        self.source_dir = source_dir
+        self.store_dir = store_dir
+        self.min_interval = min_interval
+        self.version = 0
+        self.last_result = None
+        self.last_poll = None  # Wall-clock time of the last scan, for display
+        self._signature = None
+        self._last_scan = None
+        self._lock = threading.Lock()
+
+    def poll(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_scan is not None and now - self._last_scan < self.min_interval:
+                return self.version
+            self._last_scan = now
+            self.last_poll = time.time()
+            signature = directory_signature(self.source_dir)
+            if signature != self._signature:
+                self.last_result = ingest_directory(self.source_dir, self.store_dir)
+                self._signature = signature
+                if self.last_result["ingested"]:
+                    self.version += 1
+            return self.version
+
+
+def store_columns(store_dir=DEFAULT_STORE_DIR):
+    columns = set()
+    for record in load_manifest(store_dir)["files"].values():
+        columns.update(record["columns"])
+    return columns
+
+
+def read_column(column, store_dir=DEFAULT_STORE_DIR):
+    # Same {filename: {"df", "date"}} shape as st.session_state.uploaded_data, but each
+    # frame only holds the requested column (plus the sums a ratio column rolls up from)
+    reports = {}
+    files = load_manifest(store_dir)["files"]
+    for filename, record in sorted(files.items(), key=lambda item: item[1]["date"]):
+        if column not in record["columns"]:
+            continue
+        columns = [col for col in ratio_inputs(column) if col in record["columns"]]
+        df = pd.read_parquet(os.path.join(store_dir, record["path"]), columns=columns)
+        reports[filename] = {"df": df, "date": record["date"]}
+    return reports
+
+
+def read_reports(store_dir=DEFAULT_STORE_DIR):
+    # Every stored report with all of its columns, for views that need whole reports
+    # (the company × period index) rather than one column
+    reports = {}
+    files = load_manifest(store_dir)["files"]
+    for filename, record in sorted(files.items(), key=lambda item: item[1]["date"]):
+        reports[filename] = {"df": pd.read_parquet(os.path.join(store_dir, record["path"])), "date": record["date"]}
+    return reports